@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, or_
+
+from models import db, NewsPost, Album, Photo, SyncTombstone
+from pagination import decode_cursor, encode_cursor, keyset_page
+
+# Read-only JSON for the PWA. Lists: ?cursor= (newest first, same keyset as
+# the HTML pages). Delta sync: ?since=<timestamp or token> returns what
+# changed after it, oldest first, with the ids deleted since.
+# Reads stay on the primary: replica lag could make a delta skip rows.
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def _ts(value):
+    return value.isoformat() + "Z" if value else None
+
+
+def _compact(data: dict) -> dict:
+    return {k: v for k, v in data.items() if v not in (None, "")}
+
+
+def news_json(p) -> dict:
+    return _compact({
+        "id": p.id,
+        "title": p.title,
+        "content": p.content,
+        "thumb": p.thumb_path or p.image_path,
+        "event_link": p.event_link,
+        "created_at": _ts(p.created_at),
+        "updated_at": _ts(p.updated_at),
+    })
+
+
+def album_json(a) -> dict:
+    return _compact({
+        "id": a.id,
+        "title": a.title,
+        "description": a.description,
+        "created_at": _ts(a.created_at),
+        "updated_at": _ts(a.updated_at),
+    })
+
+
+def photo_json(p) -> dict:
+    return _compact({
+        "id": p.id,
+        "album_id": p.album_id,
+        "caption": p.caption,
+        "thumb": p.thumb_path or p.file_path,
+        "medium": p.medium_path,
+        "full": p.file_path,
+        "width": p.width,
+        "height": p.height,
+        "created_at": _ts(p.created_at),
+        "updated_at": _ts(p.updated_at),
+    })
+
+
+def _limit() -> int:
+    default = current_app.config.get("API_PAGE_SIZE", 50)
+    limit = request.args.get("limit", default, type=int) or default
+    return max(1, min(limit, current_app.config.get("API_MAX_PAGE_SIZE", 200)))
+
+
+def parse_since(raw: str):
+    """'<iso>' or a token '<iso>_<id>' from a previous response -> (datetime, id or None)."""
+    key = decode_cursor(raw)
+    if key:
+        return key
+    try:
+        since = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return (since, None)
+
+
+def delta_page(query, model, kind: str, since):
+    """Rows of query changed after since, and ids of kind deleted meanwhile.
+
+    Rows younger than API_SYNC_LAG seconds wait for the next sync, so a
+    transaction committing late cannot slip behind the returned token.
+    Returns (rows, deleted_ids, next_since, more).
+    """
+    since_at, since_id = since
+    until = datetime.utcnow() - timedelta(seconds=current_app.config.get("API_SYNC_LAG", 2))
+    after = model.updated_at > since_at
+    if since_id is not None:
+        after = or_(after, and_(model.updated_at == since_at, model.id > since_id))
+
+    limit = _limit()
+    rows = (
+        query.filter(after, model.updated_at <= until)
+        .order_by(model.updated_at, model.id)
+        .limit(limit + 1)
+        .all()
+    )
+    more = len(rows) > limit
+    if more:
+        rows = rows[:limit]
+        upper, next_since = rows[-1].updated_at, encode_cursor(rows[-1].updated_at, rows[-1].id)
+    else:
+        upper, next_since = until, until.isoformat()
+
+    deleted = [
+        ref_id for (ref_id,) in db.session.query(SyncTombstone.ref_id).filter(
+            SyncTombstone.kind == kind,
+            SyncTombstone.deleted_at > since_at,
+            SyncTombstone.deleted_at <= upper,
+        )
+    ]
+    return rows, deleted, next_since, more
+
+
+def _respond(query, model, kind: str, to_json, date_col):
+    if "since" in request.args:
+        since = parse_since(request.args["since"])
+        if since is None:
+            return jsonify(error="since invalide"), 400
+        rows, deleted, next_since, more = delta_page(query, model, kind, since)
+        return jsonify(items=[to_json(r) for r in rows], deleted=deleted, since=next_since, more=more)
+
+    rows, next_cursor = keyset_page(query, date_col, model.id, request.args.get("cursor", ""), _limit())
+    return jsonify(items=[to_json(r) for r in rows], next=next_cursor or None)
+
+
+def _members_only():
+    if not current_user.is_authenticated:
+        return jsonify(error="connexion requise"), 401
+    return None
+
+
+@api.get("/news")
+def news():
+    return _respond(NewsPost.query, NewsPost, "news", news_json, NewsPost.created_at)
+
+
+@api.get("/albums")
+def albums():
+    denied = _members_only()
+    if denied:
+        return denied
+    query = Album.query.filter(Album.approved.is_(True))
+    return _respond(query, Album, "album", album_json, Album.created_at)
+
+
+def _visible_photos():
+    return Photo.query.join(Album, Album.id == Photo.album_id).filter(
+        Photo.approved.is_(True), Album.approved.is_(True)
+    )
+
+
+@api.get("/photos")
+def photos():
+    denied = _members_only()
+    if denied:
+        return denied
+    return _respond(_visible_photos(), Photo, "photo", photo_json, Photo.created_at)
+
+
+@api.get("/albums/<int:album_id>/photos")
+def album_photos(album_id):
+    denied = _members_only()
+    if denied:
+        return denied
+    query = _visible_photos().filter(Photo.album_id == album_id)
+    return _respond(query, Photo, "photo", photo_json, Photo.created_at)
@@ -1,18 +1,54 @@
 import os
 import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, render_template, request, redirect, url_for, flash, current_app
+import click
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
-from sqlalchemy import text
+from sqlalchemy import func, select, update
 
 import stripe
 import cloudinary
 import cloudinary.uploader
 
 from config import Config
-from models import db, User, NewsPost, Album, Photo, ContactMessage
+from models import db, User, NewsPost, Album, Photo, ContactMessage, SyncTombstone
+from images import (
+    FORMAT_EXTENSIONS, blob_lock, blob_paths, hash_stream, image_size, is_image, open_image, touch_blob,
+    write_derivatives,
+)
+from media_queue import (
+    media_queue_enabled, cloudinary_variants, spool_upload, enqueue_upload,
+    run_pending, run_worker, start_worker_thread, LocalFakeUploader,
+)
+from uploads import (
+    UploadError, chunk_size, create_session, load_session, append_chunk, offset as upload_offset, is_complete,
+    open_file, discard,
+)
+from media_cleanup import delete_uploaded_images
+from moderation import (
+    parse_ids, pending_photos, pending_albums, pending_counts,
+    approve_photos, approve_albums, reject_photos, reject_albums, photo_images,
+)
+from mail_outbox import mail_enabled, enqueue_contact_email, send_pending, run_sender, start_sender_thread
+from pagination import encode_cursor, keyset_page
+from database import configure_engines, init_read_your_writes, read_only
+from assets import build_assets, init_assets
+from service_worker import init_service_worker, offline_page
+from prerender import init_prerender, get_prerenderer, news_changed
+from api import api
+from exports import exports
+from metrics import init_metrics, timed_call
+from search import search
+from migrations import MIGRATIONS, migrate, pending_migrations, seed_initial_admin
+from rate_limit import init_rate_limiter, get_rate_limiter, check_auth_rate_limit
+from cache import (
+    NEWS_ENDPOINTS, init_response_cache, cached_page,
+    init_build_stamp, conditional_page, static_version,
+    init_user_cache, load_cached_user, invalidate_user,
+)
 
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
 
@@ -60,60 +96,229 @@ def allowed_file(filename: str) -> bool:
 
 
 def save_uploaded_image(file_storage, default_subfolder: str = "uploads"):
-    """Save image locally or to Cloudinary. Returns (url, public_id)."""
+    """Save image locally or to Cloudinary.
+
+    Returns (url, public_id, variants) ; variants holds thumb_path,
+    medium_path, width and height (empty dict when nothing was resized).
+    """
     if not file_storage or file_storage.filename == "":
-        return ("", "")
+        return ("", "", {})
     if not allowed_file(file_storage.filename):
-        return ("", "")
+        return ("", "", {})
 
     cfg = current_app.config
 
     if cfg.get("CLOUDINARY_CLOUD_NAME") and cfg.get("CLOUDINARY_API_KEY") and cfg.get("CLOUDINARY_API_SECRET"):
         folder = f"{cfg.get('CLOUDINARY_FOLDER', 'tily-cergy-fandresena')}/{default_subfolder}"
-        res = cloudinary.uploader.upload(file_storage, folder=folder, resource_type="image")
+        with timed_call("cloudinary"):
+            res = cloudinary.uploader.upload(file_storage, folder=folder, resource_type="image")
         url = res.get("secure_url") or res.get("url") or ""
         public_id = res.get("public_id") or ""
-        return (url, public_id)
+        return (url, public_id, cloudinary_variants(public_id, res))
 
     upload_folder = cfg["UPLOAD_FOLDER"]
-    os.makedirs(upload_folder, exist_ok=True)
-
-    filename = secure_filename(file_storage.filename)
-    save_path = os.path.join(upload_folder, filename)
-
-    i = 1
-    base, ext = os.path.splitext(filename)
-    while os.path.exists(save_path):
-        filename = f"{base}-{i}{ext}"
-        save_path = os.path.join(upload_folder, filename)
-        i += 1
-
-    file_storage.save(save_path)
-    return (f"/{upload_folder}/{filename}", "")
-
-
-def delete_uploaded_image(url: str, public_id: str = ""):
-    """Best-effort delete."""
-    cfg = current_app.config
+    digest = hash_stream(file_storage.stream)
 
     try:
-        if public_id and cfg.get("CLOUDINARY_CLOUD_NAME"):
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            return
+        img = open_image(file_storage.stream)
     except Exception:
-        current_app.logger.exception("Cloudinary delete failed")
-
+        current_app.logger.warning("Rejected upload (not a readable image): %s", file_storage.filename)
+        return ("", "", {})
+
+    paths = blob_paths(upload_folder, digest, FORMAT_EXTENSIONS.get(img.format, ".png"))
+    os.makedirs(paths["dir"], exist_ok=True)
+    # Under the lock, a delete of the same blob (media_cleanup) runs entirely
+    # before (we write the files again) or after (it sees them fresh and keeps them)
+    with blob_lock(paths["full"]):
+        if os.path.exists(paths["full"]) and os.path.exists(paths["thumb"]) and os.path.exists(paths["medium"]):
+            # Same bytes already stored: the new row shares the blob
+            touch_blob(paths)
+            size = image_size(paths["full"])
+        else:
+            size = write_derivatives(img, paths["full"], paths["thumb"], paths["medium"])
+
+    def to_url(path):
+        return "/" + path.replace(os.sep, "/")
+
+    variants = {"thumb_path": to_url(paths["thumb"]), "medium_path": to_url(paths["medium"]), **size}
+    return (to_url(paths["full"]), "", variants)
+
+
+def store_upload(file_storage, default_subfolder: str = "uploads"):
+    """File part of an upload, without DB access (safe to run in a thread).
+
+    Returns None when the file is refused, else a dict for apply_upload().
+    With the media queue the file is only spooled: the worker sends it.
+    """
+    if not file_storage or not file_storage.filename or not allowed_file(file_storage.filename):
+        return None
+
+    if media_queue_enabled():
+        if not is_image(file_storage.stream):
+            return None
+        return {"spool_path": spool_upload(file_storage), "subfolder": default_subfolder}
+
+    image_url, public_id, variants = save_uploaded_image(file_storage, default_subfolder)
+    if not image_url:
+        return None
+    return {"url": image_url, "public_id": public_id, "variants": variants}
+
+
+def store_uploads(files, default_subfolder: str = "uploads"):
+    """store_upload() for many files through a bounded thread pool.
+
+    Returns [(stored or None, error message)] in the order of files.
+    """
+    app = current_app._get_current_object()
+
+    def work(file_storage):
+        with app.app_context():
+            try:
+                return (store_upload(file_storage, default_subfolder), "")
+            except Exception:
+                app.logger.exception("Upload failed: %s", file_storage.filename)
+                return (None, "Erreur pendant l’enregistrement.")
+
+    max_workers = max(1, min(app.config.get("UPLOAD_WORKERS", 4), len(files)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(work, files))
+
+
+def apply_upload(row, stored: dict):
+    """Fill row (Photo or NewsPost) from store_upload() and add it to the session."""
+    db.session.add(row)
+    if "spool_path" in stored:
+        db.session.flush()
+        enqueue_upload(row, stored["spool_path"], stored["subfolder"])
+        return
+
+    setattr(row, "file_path" if isinstance(row, Photo) else "image_path", stored["url"])
+    row.cloudinary_public_id = stored["public_id"]
+    for key, value in stored["variants"].items():
+        setattr(row, key, value)
+
+
+def attach_uploaded_image(row, file_storage, default_subfolder: str = "uploads") -> bool:
+    """Store the upload for row (Photo or NewsPost, not committed yet)."""
+    stored = store_upload(file_storage, default_subfolder)
+    if stored is None:
+        return False
+    apply_upload(row, stored)
+    return True
+
+
+def attach_completed_upload(row, upload_id: str, default_subfolder: str = "uploads") -> bool:
+    """attach_uploaded_image() for a finished resumable upload of current_user."""
+    meta = load_session(upload_id, current_user.id)
+    if meta is None or not is_complete(meta):
+        return False
+    file = open_file(meta)
     try:
-        if url.startswith("/"):
-            path = url.lstrip("/")
-            if path.startswith("static/") and os.path.exists(path):
-                os.remove(path)
-    except Exception:
-        current_app.logger.exception("Local file delete failed")
+        return attach_uploaded_image(row, file, default_subfolder)
+    finally:
+        file.close()
+        discard(meta)
+
+
+def attach_form_image(row, file_storage, upload_id: str, default_subfolder: str = "uploads") -> bool:
+    """Optional image of a form: resumable upload (upload_id field) or plain file.
+
+    True when the form has no image.
+    """
+    if upload_id:
+        return attach_completed_upload(row, upload_id, default_subfolder)
+    if file_storage and file_storage.filename:
+        return attach_uploaded_image(row, file_storage, default_subfolder)
+    return True
+
+
+class AppRequest(Request):
+    """Batch photo uploads and upload chunks get their own body size limit."""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == "album_batch_upload":
+            return current_app.config.get("BATCH_MAX_CONTENT_LENGTH")
+        if self.endpoint == "upload_chunk":
+            return chunk_size()
+        return super().max_content_length
+
+
+def news_page(cursor: str = "", per_page: int = 0):
+    """One page of the news feed, newest first. Returns (posts, next_cursor)."""
+    per_page = per_page or current_app.config.get("NEWS_PER_PAGE", 12)
+    return keyset_page(NewsPost.query, NewsPost.created_at, NewsPost.id, cursor, per_page)
+
+
+def prerendered_pages():
+    """(endpoint, URL values) of the pages frozen to static HTML (flask --app app freeze)."""
+    pages = [("home", {}), ("nous_connaitre", {}), ("nous_soutenir", {})]
+    return pages + [("seo_page", {"slug": slug}) for slug in SEO_PAGES]
+
+
+def news_version():
+    """Validator of pages listing news: changes on every insert, edit and delete.
+
+    Two index-only MAX lookups (updated_at index, tombstone (kind, deleted_at)
+    index), so the check stays cheap however many posts there are.
+    """
+    updated, deleted = db.session.execute(select(
+        select(func.max(NewsPost.updated_at)).scalar_subquery(),
+        select(func.max(SyncTombstone.deleted_at)).where(SyncTombstone.kind == "news").scalar_subquery(),
+    )).one()
+    return (f"{updated}|{deleted}", max(filter(None, (updated, deleted)), default=None))
+
+
+def album_photos_page(album_id: int, cursor: str = ""):
+    """Photos of an album visible to current_user, newest first (keyset page).
+
+    Members only get approved rows whose upload has landed (as counted by
+    album_index), filtered by the (album_id, approved, created_at) index
+    instead of in the template.
+    """
+    query = Photo.query.filter(Photo.album_id == album_id)
+    if not current_user.is_staff() and current_user.role != "ADMIN":
+        query = query.filter(Photo.approved.is_(True), Photo.upload_status == "ready")
+    per_page = current_app.config.get("PHOTOS_PER_PAGE", 60)
+    return keyset_page(query, Photo.created_at, Photo.id, cursor, per_page)
+
+
+def album_index():
+    """Albums visible to current_user with approved-photo count and cover, in one query.
+
+    Rows expose .Album, .photo_count, .cover_thumb, .cover_file (None when
+    the album has no approved photo yet). Count and cover are correlated
+    subqueries on (album_id, approved, created_at): each album costs a few
+    index lookups, whatever the number of photos in other albums.
+    """
+    visible = (Photo.album_id == Album.id, Photo.approved.is_(True), Photo.upload_status == "ready")
+    cover_id = (
+        db.select(Photo.id).where(*visible)
+        .order_by(Photo.created_at.desc(), Photo.id.desc())
+        .limit(1)
+        .correlate(Album)
+        .scalar_subquery()
+    )
+    photo_count = db.select(func.count(Photo.id)).where(*visible).correlate(Album).scalar_subquery()
+
+    cover = db.aliased(Photo)
+    query = (
+        db.session.query(
+            Album,
+            photo_count.label("photo_count"),
+            cover.thumb_path.label("cover_thumb"),
+            cover.file_path.label("cover_file"),
+        )
+        .outerjoin(cover, cover.id == cover_id)
+    )
+    if not current_user.is_staff() and current_user.role != "ADMIN":
+        query = query.filter(Album.approved.is_(True))
+    return query.order_by(Album.created_at.desc(), Album.id.desc()).all()
 
 
 def create_app():
     app = Flask(__name__)
+    app.request_class = AppRequest
     app.config.from_object(Config)
 
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
@@ -132,7 +337,15 @@ def create_app():
     os.makedirs("instance", exist_ok=True)
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+    configure_engines(app)
     db.init_app(app)
+    init_read_your_writes(app)
+    init_metrics(app)
+    init_response_cache(app)
+    init_build_stamp(app)
+    init_assets(app)
+    init_user_cache(app)
+    init_rate_limiter(app)
 
     login_manager = LoginManager()
     login_manager.login_view = "login"
@@ -140,7 +353,7 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return db.session.get(User, int(user_id))
+        return load_cached_user(int(user_id))
 
     stripe.api_key = app.config.get("STRIPE_SECRET_KEY", "")
 
@@ -152,51 +365,89 @@ def create_app():
             secure=True,
         )
 
-    with app.app_context():
-        auto_create = os.getenv("AUTO_CREATE_DB", "false").lower() in ("1", "true", "yes", "y")
-        if auto_create:
-            db.create_all()
-
-        try:
-            db.session.execute(
-                text("ALTER TABLE news_post ADD COLUMN IF NOT EXISTS event_link VARCHAR(500) DEFAULT ''")
-            )
-            db.session.commit()
-            app.logger.info("Migration OK: event_link ready.")
-        except Exception:
-            db.session.rollback()
-            app.logger.exception("Migration event_link skipped/failed.")
-
-        try:
-            admin_user = os.getenv("INIT_ADMIN_USER")
-            admin_pass = os.getenv("INIT_ADMIN_PASS")
-            if admin_user and admin_pass:
-                exists = User.query.filter_by(username=admin_user.lower()).first()
-                if not exists:
-                    u = User(username=admin_user.lower(), role="ADMIN", role_validated=True)
-                    u.set_password(admin_pass)
-                    db.session.add(u)
-                    db.session.commit()
-                    app.logger.info("Initial admin created.")
-        except Exception:
-            app.logger.exception("Admin seed skipped (tables not ready).")
+    # Schema changes and seeding are a release step (flask --app app migrate),
+    # never done by web workers. AUTO_CREATE_DB=true runs them at boot for local dev.
+    if os.getenv("AUTO_CREATE_DB", "false").lower() in ("1", "true", "yes", "y"):
+        with app.app_context():
+            migrate(logger=app.logger)
+            seed_initial_admin(app.logger)
+
+    @app.cli.command("migrate")
+    @click.option("--status", is_flag=True, help="Liste les migrations sans rien appliquer.")
+    def migrate_command(status):
+        """Applique les migrations en attente puis crée l'admin initial (release)."""
+        if status:
+            pending = {version for version, _, _ in pending_migrations()}
+            for version, name, _ in MIGRATIONS:
+                click.echo(f"{version:03d} {'en attente' if version in pending else 'appliquée'}  {name}")
+            return
+        applied = migrate(logger=app.logger)
+        click.echo(f"{len(applied)} migration(s) appliquée(s).")
+        if seed_initial_admin(app.logger):
+            click.echo("Admin initial créé.")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Écrit static/dist : fichiers fingerprintés, copies .gz/.br et WebP (build)."""
+        manifest = build_assets(app.static_folder)
+        click.echo(f"{len(manifest['files'])} fichier(s), {len(manifest['webp'])} WebP.")
+
+    @app.cli.command("freeze")
+    def freeze_command():
+        """Écrit les pages publiques en HTML statique + sitemap.xml et robots.txt (démarrage)."""
+        written = get_prerenderer().render()
+        click.echo(f"{len(written)} page(s) dans {app.config['PRERENDER_FOLDER']}.")
+
+    @app.cli.command("mail-sender")
+    @click.option("--once", is_flag=True, help="Envoie un lot d'emails dus puis s'arrête (cron).")
+    def mail_sender(once):
+        """Envoie les emails de l'outbox (copies du formulaire de contact)."""
+        if once:
+            click.echo(f"{send_pending()} email(s) traité(s).")
+            return
+        run_sender(None, app.config.get("MAIL_SENDER_POLL", 10.0))
+
+    @app.cli.command("media-worker")
+    @click.option("--once", is_flag=True, help="Traite les jobs dus puis s'arrête (cron).")
+    @click.option("--fake", is_flag=True, help="Uploader local (instance/fake_cloudinary) au lieu de Cloudinary.")
+    def media_worker(once, fake):
+        """Envoie / supprime les images Cloudinary en file d'attente."""
+        uploader = LocalFakeUploader() if fake else None
+        if once:
+            click.echo(f"{run_pending(uploader)} job(s) traité(s).")
+            return
+        run_worker(uploader, app.config.get("MEDIA_WORKER_POLL", 5.0))
 
     # ---------------- PUBLIC ----------------
     @app.get("/")
+    @read_only
+    @conditional_page(news_version)
+    @cached_page
+    @offline_page
     def home():
-        latest = NewsPost.query.order_by(NewsPost.created_at.desc()).limit(3).all()
+        latest, _ = news_page(per_page=3)
         return render_template("home.html", latest=latest)
 
     @app.get("/actus")
+    @read_only
+    @conditional_page(news_version)
+    @cached_page
+    @offline_page
     def actus():
-        posts = NewsPost.query.order_by(NewsPost.created_at.desc()).all()
-        return render_template("actus.html", posts=posts)
+        cursor = request.args.get("cursor", "").strip()
+        posts, next_cursor = news_page(cursor)
+        return render_template("actus.html", posts=posts, cursor=cursor, next_cursor=next_cursor)
 
     @app.get("/nous-connaitre")
+    @conditional_page(static_version)
+    @cached_page
+    @offline_page
     def nous_connaitre():
         return render_template("nous_connaitre.html")
 
     @app.get("/nous-soutenir")
+    @conditional_page(static_version)
+    @offline_page
     def nous_soutenir():
         return render_template(
             "nous_soutenir.html",
@@ -205,16 +456,22 @@ def create_app():
         )
 
     @app.get("/membres")
+    @conditional_page(static_version)
+    @offline_page
     def members_entry():
         return render_template("membres.html")
 
     @app.get("/<slug>")
+    @read_only
+    @conditional_page(news_version)
+    @cached_page
+    @offline_page
     def seo_page(slug):
         seo = SEO_PAGES.get(slug)
         if not seo:
             return render_template("404.html"), 404
 
-        latest = NewsPost.query.order_by(NewsPost.created_at.desc()).limit(3).all()
+        latest, _ = news_page(per_page=3)
 
         return render_template(
             "seo_page.html",
@@ -227,7 +484,27 @@ def create_app():
             canonical_url=url_for("seo_page", slug=slug, _external=True),
         )
 
+    @app.get("/recherche")
+    @read_only
+    def search_page():
+        q = request.args.get("q", "").strip()[:200]
+        page = request.args.get("page", 1, type=int) or 1
+        members = current_user.is_authenticated
+        moderator = members and (current_user.is_staff() or current_user.role == "ADMIN")
+        hits, has_next = search(q, page, members=members, moderator=moderator) if q else ([], False)
+
+        for hit in hits:
+            row = hit["row"]
+            if hit["kind"] == "news":
+                # Feed page starting at this post (cursor = just before it)
+                hit["url"] = url_for("actus", cursor=encode_cursor(row.created_at, row.id - 1))
+            else:
+                hit["url"] = url_for("album_view", album_id=row.id if hit["kind"] == "album" else row.album_id)
+
+        return render_template("search.html", q=q, page=page, hits=hits, has_next=has_next)
+
     @app.route("/contact", methods=["GET", "POST"])
+    @offline_page
     def contact():
         if request.method == "POST":
             name = request.form.get("name", "").strip()
@@ -241,6 +518,8 @@ def create_app():
 
             cm = ContactMessage(name=name, email=email, subject=subject, message=message)
             db.session.add(cm)
+            if mail_enabled():
+                enqueue_contact_email(cm)  # sent later by the mail sender
             db.session.commit()
 
             flash("Message envoyé ✅ (il sera visible par l’admin).", "success")
@@ -249,6 +528,10 @@ def create_app():
         return render_template("contact.html")
 
     # ---------------- AUTH ----------------
+    def too_many_attempts(template, wait):
+        flash(f"Trop de tentatives. Réessaie dans {wait} secondes.", "error")
+        return render_template(template), 429, {"Retry-After": str(wait)}
+
     @app.route("/register", methods=["GET", "POST"])
     def register():
         if request.method == "POST":
@@ -257,6 +540,10 @@ def create_app():
             password_confirm = request.form.get("password_confirm", "")
             role_choice = request.form.get("role", "JEUNE")
 
+            wait = check_auth_rate_limit("register", username)
+            if wait:
+                return too_many_attempts("register.html", wait)
+
             if not username or not password or not password_confirm:
                 flash("Merci de remplir tous les champs.", "error")
                 return redirect(url_for("register"))
@@ -298,6 +585,11 @@ def create_app():
             username = request.form.get("username", "").strip().lower()
             password = request.form.get("password", "")
 
+            # Before any password hash: floods must not eat the workers' CPU
+            wait = check_auth_rate_limit("login", username)
+            if wait:
+                return too_many_attempts("login.html", wait)
+
             user = User.query.filter_by(username=username).first()
             if not user or not user.check_password(password):
                 flash("Login ou mot de passe incorrect.", "error")
@@ -327,7 +619,8 @@ def create_app():
             old = request.form.get("old_password", "")
             new = request.form.get("new_password", "")
 
-            if not current_user.check_password(old):
+            user = db.session.get(User, current_user.id)  # current_user may be a cached snapshot
+            if not user.check_password(old):
                 flash("Ancien mot de passe incorrect.", "error")
                 return redirect(url_for("change_password"))
 
@@ -335,8 +628,9 @@ def create_app():
                 flash("Nouveau mot de passe trop court (8 caractères minimum).", "error")
                 return redirect(url_for("change_password"))
 
-            current_user.set_password(new)
+            user.set_password(new)
             db.session.commit()
+            invalidate_user(user.id)
             flash("Mot de passe mis à jour ✅", "success")
             return redirect(url_for("member_area"))
 
@@ -345,9 +639,9 @@ def create_app():
     # ---------------- MEMBER AREA ----------------
     @app.get("/espace")
     @login_required
+    @read_only
     def member_area():
-        albums = Album.query.order_by(Album.created_at.desc()).all()
-        return render_template("album_list.html", albums=albums)
+        return render_template("album_list.html", albums=album_index())
 
     @app.route("/album/nouveau", methods=["GET", "POST"])
     @login_required
@@ -381,12 +675,13 @@ def create_app():
     @login_required
     def album_view(album_id):
         album = db.session.get(Album, album_id)
-        if not album:
+        is_moderator = current_user.is_staff() or current_user.role == "ADMIN"
+        if not album or (not album.approved and not is_moderator):
             flash("Album introuvable.", "error")
             return redirect(url_for("member_area"))
 
         if request.method == "POST":
-            if not current_user.is_staff() and current_user.role != "ADMIN":
+            if not is_moderator:
                 flash("Upload réservé (KP/RESPONSABLE validé).", "error")
                 return redirect(url_for("album_view", album_id=album_id))
 
@@ -406,26 +701,164 @@ def create_app():
                 flash("Format non autorisé (png/jpg/jpeg/webp).", "error")
                 return redirect(url_for("album_view", album_id=album_id))
 
-            image_url, public_id = save_uploaded_image(file, default_subfolder="albums")
-            if not image_url:
+            p = Photo(album_id=album_id, file_path="", caption=caption, approved=False)
+            if not attach_uploaded_image(p, file, default_subfolder="albums"):
+                db.session.rollback()
                 flash("Upload impossible.", "error")
                 return redirect(url_for("album_view", album_id=album_id))
 
-            p = Photo(
-                album_id=album_id,
-                file_path=image_url,
-                caption=caption,
-                approved=False,
-                cloudinary_public_id=public_id
-            )
             db.session.add(p)
             db.session.commit()
 
             flash("Photo ajoutée ✅", "success")
             return redirect(url_for("album_view", album_id=album_id))
 
-        photos = Photo.query.filter_by(album_id=album_id).order_by(Photo.created_at.desc()).all()
-        return render_template("album_view.html", album=album, photos=photos)
+        cursor = request.args.get("cursor", "").strip()
+        photos, next_cursor = album_photos_page(album_id, cursor)
+        return render_template(
+            "album_view.html", album=album, photos=photos, cursor=cursor, next_cursor=next_cursor
+        )
+
+    @app.post("/album/<int:album_id>/photos")
+    @login_required
+    def album_batch_upload(album_id):
+        """Many photos in one request ; JSON report per file if asked for."""
+        wants_json = request.accept_mimetypes.best == "application/json"
+
+        def fail(message, status=400):
+            if wants_json:
+                return jsonify(ok=False, error=message), status
+            flash(message, "error")
+            return redirect(url_for("album_view", album_id=album_id))
+
+        if not current_user.is_staff() and current_user.role != "ADMIN":
+            return fail("Upload réservé (KP/RESPONSABLE validé).", 403)
+
+        album = db.session.get(Album, album_id)
+        if not album:
+            return fail("Album introuvable.", 404)
+
+        if request.form.get("consent", "") != "yes":
+            return fail("Merci de confirmer le respect du droit à l’image.")
+
+        files = [f for f in request.files.getlist("photos") if f and f.filename]
+        if not files:
+            return fail("Aucun fichier sélectionné.")
+
+        max_files = app.config.get("BATCH_MAX_FILES", 50)
+        if len(files) > max_files:
+            return fail(f"{max_files} photos maximum par envoi.")
+
+        caption = request.form.get("caption", "").strip()
+        report = []
+        for file, (stored, error) in zip(files, store_uploads(files, default_subfolder="albums")):
+            if stored is None:
+                report.append({"filename": file.filename, "ok": False,
+                               "error": error or "Format non autorisé ou fichier illisible."})
+                continue
+            p = Photo(album_id=album_id, file_path="", caption=caption, approved=False)
+            apply_upload(p, stored)
+            report.append({"filename": file.filename, "ok": True, "photo": p})
+
+        db.session.commit()  # every Photo row in one transaction
+
+        for item in report:
+            photo = item.pop("photo", None)
+            if photo is not None:
+                item["photo_id"] = photo.id
+                item["upload_status"] = photo.upload_status
+
+        added = sum(1 for item in report if item["ok"])
+        if wants_json:
+            return jsonify(ok=True, added=added, results=report)
+
+        flash(f"{added} photo(s) ajoutée(s) ✅", "success")
+        refused = [item["filename"] for item in report if not item["ok"]]
+        if refused:
+            flash("Refusées : " + ", ".join(refused), "error")
+        return redirect(url_for("album_view", album_id=album_id))
+
+    # ---------------- RESUMABLE UPLOADS ----------------
+    @app.post("/upload")
+    @login_required
+    def upload_create():
+        """Déclare un envoi par morceaux (JSON : filename, size, target album|news, album_id, caption, consent)."""
+        if not current_user.is_staff() and current_user.role != "ADMIN":
+            return jsonify(error="Upload réservé (KP/RESPONSABLE validé)."), 403
+
+        data = request.get_json(silent=True) or request.form
+        filename = str(data.get("filename", ""))
+        if not allowed_file(filename):
+            return jsonify(error="Format non autorisé (png/jpg/jpeg/webp)."), 415
+
+        target = data.get("target")
+        extra = {}
+        if target == "album":
+            album_id = str(data.get("album_id", ""))
+            album = db.session.get(Album, int(album_id)) if album_id.isdigit() else None
+            if not album:
+                return jsonify(error="Album introuvable."), 404
+            if data.get("consent") != "yes":
+                return jsonify(error="Merci de confirmer le respect du droit à l’image."), 400
+            extra = {"album_id": album.id, "caption": str(data.get("caption", "")).strip()[:200]}
+        elif target != "news":
+            return jsonify(error="Destination inconnue."), 400
+
+        try:
+            meta = create_session(current_user.id, filename, int(data.get("size") or 0), target, **extra)
+        except (UploadError, ValueError) as e:
+            return jsonify(error=getattr(e, "message", "Taille invalide.")), getattr(e, "status", 400)
+
+        return jsonify(
+            id=meta["id"],
+            offset=0,
+            chunk_size=chunk_size(),
+            url=url_for("upload_chunk", upload_id=meta["id"]),
+        ), 201
+
+    @app.route("/upload/<upload_id>", methods=["HEAD", "PATCH", "DELETE"])
+    @login_required
+    def upload_chunk(upload_id):
+        """HEAD : où reprendre ; PATCH (Upload-Offset) : un morceau ; DELETE : abandon."""
+        meta = load_session(upload_id, current_user.id)
+        if meta is None:
+            return jsonify(error="Envoi introuvable ou expiré."), 404
+
+        if request.method == "DELETE":
+            discard(meta)
+            return "", 204
+
+        if request.method == "HEAD":
+            resp = current_app.response_class(status=200)
+            resp.headers["Upload-Offset"] = str(upload_offset(meta))
+            resp.headers["Upload-Length"] = str(meta["size"])
+            resp.headers["Cache-Control"] = "no-store"
+            return resp
+
+        try:
+            at = int(request.headers.get("Upload-Offset", ""))
+            new_offset = append_chunk(meta, at, request.get_data(cache=False))
+        except ValueError:
+            return jsonify(error="En-tête Upload-Offset manquant."), 400
+        except UploadError as e:
+            return jsonify(error=e.message, offset=upload_offset(meta)), e.status
+
+        if new_offset < meta["size"]:
+            return jsonify(offset=new_offset, done=False)
+
+        if meta["target"] == "news":
+            # The news form is sent next, with upload_id (attach_form_image)
+            return jsonify(offset=new_offset, done=True, upload_id=meta["id"])
+
+        if not db.session.get(Album, meta["album_id"]):
+            discard(meta)
+            return jsonify(error="Album introuvable."), 404
+        p = Photo(album_id=meta["album_id"], file_path="", caption=meta.get("caption", ""), approved=False)
+        if not attach_completed_upload(p, meta["id"], default_subfolder="albums"):
+            db.session.rollback()
+            return jsonify(error="Image refusée (png/jpg/jpeg/webp)."), 415
+        db.session.commit()
+        return jsonify(offset=new_offset, done=True, photo_id=p.id, upload_status=p.upload_status)
 
     @app.post("/album/<int:album_id>/approve")
     @login_required
@@ -440,6 +873,8 @@ def create_app():
             return redirect(url_for("member_area"))
 
         album.approved = True
+        # Its approved photos become visible: make the delta sync send them
+        db.session.execute(update(Photo).where(Photo.album_id == album.id).values(updated_at=datetime.utcnow()))
         db.session.commit()
         flash("Album approuvé ✅", "success")
         return redirect(url_for("member_area"))
@@ -461,6 +896,51 @@ def create_app():
         flash("Photo approuvée ✅", "success")
         return redirect(url_for("album_view", album_id=photo.album_id))
 
+    @app.route("/staff/moderation", methods=["GET", "POST"])
+    @login_required
+    def moderation_queue():
+        """Pending photos / albums of every album, approved or rejected in bulk."""
+        if not current_user.is_staff() and current_user.role != "ADMIN":
+            flash("Accès réservé (KP/RESPONSABLE validé).", "error")
+            return redirect(url_for("member_area"))
+
+        if request.method == "POST":
+            action = request.form.get("action", "")
+            kind = request.form.get("kind", "")
+            cursor = request.form.get("cursor", "").strip()
+            ids = parse_ids(request.form.getlist("ids"), app.config.get("MODERATION_MAX_IDS", 500))
+            if action not in ("approve", "reject") or kind not in ("photo", "album") or not ids:
+                flash("Aucun élément sélectionné.", "error")
+                return redirect(url_for("moderation_queue", cursor=cursor or None))
+
+            rows = []
+            if action == "approve":
+                count = approve_photos(ids) if kind == "photo" else approve_albums(ids)
+            elif kind == "photo":
+                rows = reject_photos(ids)
+                count = len(rows)
+            else:
+                count, rows = reject_albums(ids)
+            delete_uploaded_images(photo_images(rows))  # one batch for every rejected file
+            db.session.commit()
+
+            label = "photo(s)" if kind == "photo" else "album(s)"
+            verb = "approuvé(s)" if action == "approve" else "supprimé(s)"
+            flash(f"{count} {label} {verb} ✅", "success")
+            return redirect(url_for("moderation_queue", cursor=cursor or None))
+
+        cursor = request.args.get("cursor", "").strip()
+        photos, album_titles, next_cursor = pending_photos(cursor, app.config.get("MODERATION_PER_PAGE", 100))
+        return render_template(
+            "moderation.html",
+            photos=photos,
+            album_titles=album_titles,
+            albums=pending_albums() if not cursor else [],
+            counts=pending_counts(),
+            cursor=cursor,
+            next_cursor=next_cursor,
+        )
+
     # ---------------- ADMIN ----------------
     @app.route("/admin", methods=["GET", "POST"])
     @login_required
@@ -485,6 +965,7 @@ def create_app():
                     user.role_validated = True
                     user.role_requested = None
                     db.session.commit()
+                    invalidate_user(user.id)
                     flash(f"Rôle validé pour {user.username} ✅", "success")
                 else:
                     flash("Aucune demande valide à approuver.", "error")
@@ -501,37 +982,88 @@ def create_app():
                     flash("Titre + contenu obligatoires.", "error")
                     return redirect(url_for("admin_dashboard"))
 
-                image_path, public_id = ("", "")
-                if file and file.filename:
-                    image_path, public_id = save_uploaded_image(file, default_subfolder="actus")
-
-                post = NewsPost(
-                    title=title,
-                    content=content,
-                    image_path=image_path,
-                    cloudinary_public_id=public_id,
-                    event_link=event_link
-                )
+                post = NewsPost(title=title, content=content, event_link=event_link)
+                upload_id = request.form.get("upload_id", "").strip()
+                if not attach_form_image(post, file, upload_id, default_subfolder="actus"):
+                    db.session.rollback()
+                    flash("Image refusée (png/jpg/jpeg/webp).", "error")
+                    return redirect(url_for("admin_dashboard"))
+
                 db.session.add(post)
                 db.session.commit()
+                news_changed()
                 flash("Actu publiée ✅", "success")
                 return redirect(url_for("admin_dashboard"))
 
-        pending = User.query.filter(
+        # Sections are fragments loaded on demand (see admin_*_fragment)
+        return render_template("admin_dashboard.html")
+
+    @app.get("/admin/demandes")
+    @login_required
+    def admin_pending_fragment():
+        if current_user.role != "ADMIN":
+            return "", 403
+
+        cursor = request.args.get("cursor", "").strip()
+        query = User.query.filter(
             User.role_requested.in_(["KP", "RESPONSABLE"]),
             User.role_validated.is_(False)
-        ).order_by(User.id.desc()).all()
-
-        messages = ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
-        posts = NewsPost.query.order_by(NewsPost.created_at.desc()).all()
+        )
+        pending, next_cursor = keyset_page(
+            query, User.created_at, User.id, cursor, app.config.get("ADMIN_PER_PAGE", 20)
+        )
+        return render_template("_admin_pending.html", pending=pending, cursor=cursor, next_cursor=next_cursor)
 
+    @app.get("/admin/messages")
+    @login_required
+    def admin_messages_fragment():
+        if current_user.role != "ADMIN":
+            return "", 403
+
+        cursor = request.args.get("cursor", "").strip()
+        show = "all" if request.args.get("show") == "all" else "unread"
+        query = ContactMessage.query
+        if show == "unread":
+            query = query.filter(ContactMessage.is_read.is_(False))
+        messages, next_cursor = keyset_page(
+            query, ContactMessage.created_at, ContactMessage.id, cursor, app.config.get("ADMIN_PER_PAGE", 20)
+        )
         return render_template(
-            "admin_dashboard.html",
-            pending=pending,
-            messages=messages,
-            posts=posts
+            "_admin_messages.html", messages=messages, cursor=cursor, next_cursor=next_cursor, show=show
         )
 
+    @app.get("/admin/rate-limit")
+    @login_required
+    def admin_rate_limit_stats():
+        """Compteurs du limiteur (ce worker) : requêtes acceptées / refusées."""
+        if current_user.role != "ADMIN":
+            return "", 403
+        limiter = get_rate_limiter()
+        return jsonify(enabled=limiter is not None, counters=limiter.snapshot() if limiter else {})
+
+    @app.post("/admin/message/<int:message_id>/read")
+    @login_required
+    def admin_message_read(message_id):
+        if current_user.role != "ADMIN":
+            flash("Accès réservé à l’admin.", "error")
+            return redirect(url_for("home"))
+
+        message = db.session.get(ContactMessage, message_id)
+        if message:
+            message.is_read = True
+            db.session.commit()
+        return redirect(url_for("admin_dashboard"))
+
+    @app.get("/admin/actus")
+    @login_required
+    def admin_posts_fragment():
+        if current_user.role != "ADMIN":
+            return "", 403
+
+        cursor = request.args.get("cursor", "").strip()
+        posts, next_cursor = news_page(cursor, app.config.get("ADMIN_PER_PAGE", 20))
+        return render_template("_admin_posts.html", posts=posts, cursor=cursor, next_cursor=next_cursor)
+
     # ---------------- STAFF ACTUS ----------------
     @app.route("/staff/actus", methods=["GET", "POST"])
     @login_required
@@ -550,19 +1082,16 @@ def create_app():
                 flash("Titre + contenu obligatoires.", "error")
                 return redirect(url_for("staff_actus"))
 
-            image_path, public_id = ("", "")
-            if file and file.filename:
-                image_path, public_id = save_uploaded_image(file, default_subfolder="actus")
+            post = NewsPost(title=title, content=content, event_link=event_link)
+            upload_id = request.form.get("upload_id", "").strip()
+            if not attach_form_image(post, file, upload_id, default_subfolder="actus"):
+                db.session.rollback()
+                flash("Image refusée (png/jpg/jpeg/webp).", "error")
+                return redirect(url_for("staff_actus"))
 
-            post = NewsPost(
-                title=title,
-                content=content,
-                image_path=image_path,
-                cloudinary_public_id=public_id,
-                event_link=event_link
-            )
             db.session.add(post)
             db.session.commit()
+            news_changed()
             flash("Actu publiée ✅", "success")
             return redirect(url_for("actus"))
 
@@ -580,11 +1109,14 @@ def create_app():
             flash("Actu introuvable.", "error")
             return redirect(url_for("actus"))
 
-        if post.image_path:
-            delete_uploaded_image(post.image_path, getattr(post, "cloudinary_public_id", "") or "")
-
         db.session.delete(post)
+        db.session.flush()
+        if post.image_path:
+            delete_uploaded_images([
+                (post.image_path, post.cloudinary_public_id or "", (post.thumb_path, post.medium_path))
+            ])
         db.session.commit()
+        news_changed()
         flash("Actu supprimée ✅", "success")
         return redirect(url_for("admin_dashboard"))
 
@@ -601,8 +1133,9 @@ def create_app():
             return redirect(url_for("member_area"))
 
         album_id = photo.album_id
-        delete_uploaded_image(photo.file_path, getattr(photo, "cloudinary_public_id", "") or "")
         db.session.delete(photo)
+        db.session.flush()
+        delete_uploaded_images(photo_images([photo]))
         db.session.commit()
         flash("Photo supprimée ✅", "success")
         return redirect(url_for("album_view", album_id=album_id))
@@ -621,26 +1154,32 @@ def create_app():
             flash("Stripe n’est pas configuré (STRIPE_SECRET_KEY).", "error")
             return redirect(url_for("nous_soutenir"))
 
-        session = stripe.checkout.Session.create(
-            mode="payment",
-            payment_method_types=["card"],
-            line_items=[{
-                "price_data": {
-                    "currency": "eur",
-                    "product_data": {"name": "Don – Tily Cergy Fandresena (EEUdF Cergy)"},
-                    "unit_amount": amount_eur * 100,
-                },
-                "quantity": 1,
-            }],
-            success_url=f"{app.config['BASE_URL']}{url_for('don_success')}",
-            cancel_url=f"{app.config['BASE_URL']}{url_for('nous_soutenir')}",
-        )
+        with timed_call("stripe"):
+            session = stripe.checkout.Session.create(
+                mode="payment",
+                payment_method_types=["card"],
+                line_items=[{
+                    "price_data": {
+                        "currency": "eur",
+                        "product_data": {"name": "Don – Tily Cergy Fandresena (EEUdF Cergy)"},
+                        "unit_amount": amount_eur * 100,
+                    },
+                    "quantity": 1,
+                }],
+                success_url=f"{app.config['BASE_URL']}{url_for('don_success')}",
+                cancel_url=f"{app.config['BASE_URL']}{url_for('nous_soutenir')}",
+            )
         return redirect(session.url, code=303)
 
     @app.get("/don/merci")
     def don_success():
         return render_template("don_success.html")
 
+    init_service_worker(app, extra_paths=[f"/{slug}" for slug in SEO_PAGES])
+    init_prerender(app, prerendered_pages(), NEWS_ENDPOINTS)
+    app.register_blueprint(api)
+    app.register_blueprint(exports)
+
     @app.errorhandler(404)
     def not_found(e):
         return render_template("404.html"), 404
@@ -653,6 +1192,19 @@ def create_app():
     return app
 
 
+def start_background_threads(app):
+    """MEDIA_WORKER_IN_PROCESS / MAIL_SENDER_IN_PROCESS threads of a web worker.
+
+    Called by gunicorn (post_worker_init in gunicorn.conf.py), never at import:
+    `flask --app app migrate`, freeze, media-worker... must not poll queues.
+    """
+    with app.app_context():
+        if app.config.get("MEDIA_WORKER_IN_PROCESS") and media_queue_enabled():
+            start_worker_thread(app)
+        if app.config.get("MAIL_SENDER_IN_PROCESS") and mail_enabled():
+            start_sender_thread(app)
+
+
 app = create_app()
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+from PIL import Image
+
+# Folders of static/ that get fingerprinted. sw.js, manifest.json and the
+# Google verification file keep their fixed URL.
+ASSET_DIRS = ("css", "js", "img")
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt"}
+WEBP_SOURCES = {".png", ".jpg", ".jpeg"}
+WEBP_QUALITY = 82
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _hashed_name(rel_path: str, digest: str, ext: str = "") -> str:
+    base, orig_ext = os.path.splitext(rel_path)
+    return f"{DIST_DIR}/{base}.{digest}{ext or orig_ext}"
+
+
+def _precompress(path: str, data: bytes):
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli  # optional dependency, .br copies are skipped without it
+    except ImportError:
+        return
+    with open(path + ".br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def build_assets(static_folder: str) -> dict:
+    """Write static/dist/: content-hashed copies, .gz/.br and WebP versions.
+
+    Returns the manifest {"files": {src: hashed}, "webp": {src: hashed webp}},
+    also written to static/dist/manifest.json. Paths are relative to static/.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {"files": {}, "webp": {}}
+
+    for top in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, top)):
+            for name in sorted(files):
+                src = os.path.join(root, name)
+                rel = os.path.relpath(src, static_folder).replace(os.sep, "/")
+                with open(src, "rb") as f:
+                    data = f.read()
+                digest = _fingerprint(data)
+
+                hashed = _hashed_name(rel, digest)
+                out = os.path.join(static_folder, hashed)
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                shutil.copyfile(src, out)
+                manifest["files"][rel] = hashed
+
+                ext = os.path.splitext(name)[1].lower()
+                if ext in COMPRESSIBLE:
+                    _precompress(out, data)
+                if ext in WEBP_SOURCES:
+                    webp = _hashed_name(rel, digest, ".webp")
+                    with Image.open(src) as img:
+                        if img.mode not in ("RGB", "RGBA"):
+                            img = img.convert("RGBA")
+                        img.save(os.path.join(static_folder, webp), "WEBP", quality=WEBP_QUALITY, method=6)
+                    manifest["webp"][rel] = webp
+
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> dict:
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"files": {}, "webp": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def init_assets(app):
+    """Serve fingerprinted assets when static/dist/manifest.json exists.
+
+    url_for('static', filename='css/style.css') then returns the hashed
+    name, so templates need no change ; without a build, plain files are
+    served as before.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions["asset_manifest"] = manifest
+    files = manifest["files"]
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == "static" and values.get("filename") in files:
+            values["filename"] = files[values["filename"]]
+
+    @app.template_global()
+    def static_webp(filename: str) -> str:
+        """URL of the WebP version of a static image, "" when not built."""
+        webp = manifest["webp"].get(filename)
+        return f"{app.static_url_path}/{webp}" if webp else ""
+
+    @app.before_request
+    def precompressed_static():
+        if request.endpoint != "static":
+            return None
+        filename = (request.view_args or {}).get("filename", "")
+        if not filename.startswith(f"{DIST_DIR}/"):
+            return None
+        accepted = request.accept_encodings
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if accepted[encoding] and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                resp = send_from_directory(
+                    app.static_folder, filename + suffix,
+                    mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                )
+                resp.headers["Content-Encoding"] = encoding
+                return resp
+        return None
+
+    @app.after_request
+    def immutable_static(resp):
+        if request.endpoint == "static" and (request.view_args or {}).get("filename", "").startswith(f"{DIST_DIR}/"):
+            # The name changes with the content: cache forever
+            resp.headers["Cache-Control"] = IMMUTABLE
+            resp.vary.add("Accept-Encoding")
+        return resp
+
+    return manifest
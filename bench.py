@@ -0,0 +1,564 @@
+"""Benchmark: synthetic data, per-route latency and SQL counts, baselines.
+
+    python bench.py seed  [--db URL] [--scale 1.0]
+    python bench.py run   [--db URL] [--iterations 30] [--save F] [--compare F]
+    python bench.py serve [--db URL] [--workers 2] [--threads 4] [--concurrency 8] [--duration 20] [--save F] [--compare F]
+
+Never point --db at a real database: seed refuses a non-empty one, but run /
+serve log in with the bench accounts it creates. The default is
+instance/bench.db (SQLite) ; local Postgres works the same way
+(--db postgresql://localhost/tily_bench).
+
+Queries per request come from the Server-Timing header (metrics.py), so
+both modes measure the app exactly as it runs in production.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+# Flask-SQLAlchemy resolves relative SQLite paths from instance/: this is instance/bench.db
+DEFAULT_DB = "sqlite:///bench.db"
+BENCH_PASSWORD = "bench-pass"
+# Bench accounts: one per login state the pages differ on (cache.login_state)
+ACCOUNTS = {"member": ("bench-member", "JEUNE"), "staff": ("bench-kp", "KP"), "admin": ("bench-admin", "ADMIN")}
+
+# Rows at --scale 1.0
+FIXTURES = {"users": 2_000, "news": 10_000, "albums": 1_000, "photos": 200_000, "messages": 50_000}
+CHUNK = 5_000
+SPAN_DAYS = 3 * 365
+
+WORDS = (
+    "camp sortie week-end feu rando culte jeunes louveteaux éclaireurs service fête groupe nature "
+    "jeux chants prière route été hiver Cergy Pontoise forêt tente veillée projet solidaire "
+    "rassemblement parents inscription uniforme badge patrouille cuisine montagne mer"
+).split()
+
+SERVER_TIMING_SQL = re.compile(r'sql;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def configure_env(db_url: str, keep_cache: bool = False) -> dict:
+    """Environment of the app under test (this process or the gunicorn child)."""
+    env = {
+        "DATABASE_URL": db_url,
+        "DATABASE_READ_URL": "",
+        "AUTO_CREATE_DB": "false",
+        "RATE_LIMIT_ENABLED": "false",  # every request of a login state comes from one address
+        "SERVER_TIMING_ENABLED": "true",
+        "SLOW_REQUEST_MS": "0",
+        "MEDIA_WORKER_IN_PROCESS": "false",
+        "MAIL_SENDER_IN_PROCESS": "false",
+        "PRERENDER_ON_MISS": "false",  # no background render thread during the measures
+    }
+    if not keep_cache:
+        # Measure the views, not the response cache (--keep-cache for both)
+        env["RESPONSE_CACHE_TTL"] = "0"
+    os.environ.update(env)
+    return env
+
+
+def _words(rng, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _chunks(rows, size=CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+# ---------------- SEED ----------------
+def seed(scale: float, seed_value: int = 42):
+    """Bulk-insert the fixtures (Core executemany, CHUNK rows per statement).
+
+    Deterministic for a given seed ; dates spread over SPAN_DAYS so keyset
+    pages, ?since= deltas and the ETag validators see realistic data.
+    """
+    from app import app
+    from migrations import migrate
+    from models import db, User, NewsPost, Album, Photo, ContactMessage
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(seed_value)
+    counts = {name: max(1, int(n * scale)) for name, n in FIXTURES.items()}
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def spread(i, total):
+        return now - timedelta(seconds=int(SPAN_DAYS * 86400 * (total - i) / total))
+
+    with app.app_context():
+        migrate(logger=app.logger)
+        if db.session.query(NewsPost.id).first() or db.session.query(User.id).first():
+            raise SystemExit("Base non vide : seed uniquement sur une base de bench vide.")
+
+        password_hash = generate_password_hash(BENCH_PASSWORD)  # hashed once, shared by every account
+        users = [
+            dict(username=username, password_hash=password_hash, role=role, role_validated=True, created_at=now)
+            for username, role in ACCOUNTS.values()
+        ]
+        for i in range(counts["users"]):
+            requested = rng.choice(("KP", "RESPONSABLE")) if rng.random() < 0.05 else ""
+            users.append(dict(
+                username=f"user{i}", password_hash=password_hash, role="JEUNE",
+                role_requested=requested, role_validated=False, created_at=spread(i, counts["users"]),
+            ))
+
+        news = []
+        for i in range(counts["news"]):
+            created = spread(i, counts["news"])
+            thumb = f"/static/uploads/bench/news{i}.thumb.webp" if rng.random() < 0.6 else ""
+            news.append(dict(
+                title=_words(rng, 6).capitalize(), content=_words(rng, 80),
+                image_path=thumb.replace(".thumb.webp", ".jpg"), thumb_path=thumb,
+                width=1600 if thumb else None, height=1067 if thumb else None,
+                created_at=created, updated_at=created,
+            ))
+
+        albums = []
+        for i in range(counts["albums"]):
+            created = spread(i, counts["albums"])
+            albums.append(dict(
+                title=_words(rng, 4).capitalize(), description=_words(rng, 20),
+                approved=rng.random() < 0.9, created_at=created, updated_at=created,
+            ))
+
+        messages = [
+            dict(
+                name=f"Parent {i}", email=f"parent{i}@example.org", subject=_words(rng, 5),
+                message=_words(rng, 60), is_read=rng.random() < 0.8, created_at=spread(i, counts["messages"]),
+            )
+            for i in range(counts["messages"])
+        ]
+
+        for model, rows in ((User, users), (NewsPost, news), (Album, albums), (ContactMessage, messages)):
+            for chunk in _chunks(rows):
+                db.session.execute(db.insert(model), chunk)
+        db.session.commit()
+
+        # Photos: skewed over the albums (a few big camps, many small outings)
+        album_rows = db.session.execute(db.select(Album.id, Album.created_at).order_by(Album.id)).all()
+        weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(album_rows))]
+        rng.shuffle(weights)
+        photos = []
+        for i, (album_id, album_created) in enumerate(rng.choices(album_rows, weights, k=counts["photos"])):
+            created = min(album_created + timedelta(seconds=i % 86400), now)
+            base = f"/static/uploads/bench/{i % 256:02x}/p{i}"
+            photos.append(dict(
+                album_id=album_id, file_path=f"{base}.jpg", thumb_path=f"{base}.thumb.webp",
+                medium_path=f"{base}.medium.webp", width=2560, height=1707,
+                caption=_words(rng, 5) if rng.random() < 0.3 else "",
+                approved=rng.random() < 0.95, created_at=created, updated_at=created,
+            ))
+            if len(photos) == CHUNK:
+                db.session.execute(db.insert(Photo), photos)
+                photos = []
+        if photos:
+            db.session.execute(db.insert(Photo), photos)
+        db.session.commit()
+    return counts
+
+
+# ---------------- SCENARIOS ----------------
+def scenarios(app) -> list:
+    """(name, login state, method, path, form) for every route, ids taken from the data.
+
+    Routes that write (contact, register, uploads, approvals, deletes,
+    checkout...) are left out: repeated, they would change what is measured.
+    """
+    from sqlalchemy import func
+    from models import db, NewsPost, Album, Photo
+    from pagination import encode_cursor
+
+    with app.app_context():
+        per_page = app.config.get("NEWS_PER_PAGE", 12)
+        posts = db.session.query(NewsPost.created_at, NewsPost.id).order_by(
+            NewsPost.created_at.desc(), NewsPost.id.asc()
+        ).limit(per_page).all()
+        deep = db.session.query(NewsPost.created_at, NewsPost.id).order_by(
+            NewsPost.created_at.desc(), NewsPost.id.asc()
+        ).offset(db.session.query(func.count(NewsPost.id)).scalar() // 2).limit(1).first()
+        big_album = db.session.query(Photo.album_id).join(Album, Album.id == Photo.album_id).filter(
+            Album.approved.is_(True)
+        ).group_by(Photo.album_id).order_by(func.count().desc()).limit(1).scalar()
+        latest_update = db.session.query(func.max(NewsPost.updated_at)).scalar()
+
+    if not posts or big_album is None:
+        raise SystemExit("Base vide : lancer d'abord `python bench.py seed`.")
+
+    page2 = encode_cursor(*posts[-1])
+    deep_cursor = encode_cursor(*deep)
+    since = (latest_update - timedelta(days=7)).isoformat()
+    login = {"username": ACCOUNTS["member"][0], "password": BENCH_PASSWORD}
+
+    return [
+        ("home", None, "GET", "/", None),
+        ("actus", None, "GET", "/actus", None),
+        ("actus_page2", None, "GET", f"/actus?cursor={page2}", None),
+        ("actus_deep", None, "GET", f"/actus?cursor={deep_cursor}", None),
+        ("nous_connaitre", None, "GET", "/nous-connaitre", None),
+        ("nous_soutenir", None, "GET", "/nous-soutenir", None),
+        ("membres", None, "GET", "/membres", None),
+        ("seo_page", None, "GET", "/scout-cergy", None),
+        ("not_found", None, "GET", "/page-inexistante", None),
+        ("recherche_anon", None, "GET", "/recherche?q=camp", None),
+        ("recherche_member", "member", "GET", "/recherche?q=camp+feu", None),
+        ("contact_form", None, "GET", "/contact", None),
+        ("register_form", None, "GET", "/register", None),
+        ("login_form", None, "GET", "/login", None),
+        ("login_post", None, "POST", "/login", login),
+        ("don_merci", None, "GET", "/don/merci", None),
+        ("sw_js", None, "GET", "/sw.js", None),
+        ("sitemap", None, "GET", "/sitemap.xml", None),
+        ("robots", None, "GET", "/robots.txt", None),
+        ("api_news", None, "GET", "/api/v1/news", None),
+        ("api_news_since", None, "GET", f"/api/v1/news?{urlencode({'since': since})}", None),
+        ("espace", "member", "GET", "/espace", None),
+        ("change_password_form", "member", "GET", "/changer-mot-de-passe", None),
+        ("album_view", "member", "GET", f"/album/{big_album}", None),
+        ("album_view_staff", "staff", "GET", f"/album/{big_album}", None),
+        ("album_new_form", "staff", "GET", "/album/nouveau", None),
+        ("staff_actus", "staff", "GET", "/staff/actus", None),
+        ("moderation", "staff", "GET", "/staff/moderation", None),
+        ("api_albums", "member", "GET", "/api/v1/albums", None),
+        ("api_photos", "member", "GET", "/api/v1/photos", None),
+        ("api_album_photos", "member", "GET", f"/api/v1/albums/{big_album}/photos", None),
+        ("admin_dashboard", "admin", "GET", "/admin", None),
+        ("admin_demandes", "admin", "GET", "/admin/demandes", None),
+        ("admin_messages", "admin", "GET", "/admin/messages", None),
+        ("admin_messages_all", "admin", "GET", "/admin/messages?show=all", None),
+        ("admin_actus", "admin", "GET", "/admin/actus", None),
+        ("admin_rate_limit", "admin", "GET", "/admin/rate-limit", None),
+        ("metrics", "admin", "GET", "/metrics", None),
+        ("export_messages_csv", "admin", "GET", "/admin/export/messages.csv", None),
+    ]
+
+
+def uncovered_endpoints(app, scenario_list) -> list:
+    """Endpoints of the route table no scenario reaches (mostly writes)."""
+    adapter = app.url_map.bind("localhost")
+    reached = set()
+    for _, _, method, path, _ in scenario_list:
+        try:
+            reached.add(adapter.match(path.split("?")[0], method=method)[0])
+        except Exception:
+            continue
+    return sorted({r.endpoint for r in app.url_map.iter_rules()} - reached - {"static"})
+
+
+def _queries(headers) -> int:
+    match = SERVER_TIMING_SQL.search(headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(samples: list, elapsed: float = 0.0) -> dict:
+    """samples: [(seconds, queries, status)] -> p50/p95/mean in ms, req/s, queries/request."""
+    durations = [s for s, _, _ in samples]
+    result = {
+        "n": len(samples),
+        "p50_ms": round(_percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(_percentile(durations, 95) * 1000, 2),
+        "mean_ms": round(statistics.fmean(durations) * 1000, 2),
+        "queries": round(statistics.fmean(q for _, q, _ in samples), 1),
+        "status": sorted({status for _, _, status in samples}),
+    }
+    total = elapsed or sum(durations)
+    result["rps"] = round(len(samples) / total, 1) if total else 0.0
+    return result
+
+
+# ---------------- RUN (Flask test client) ----------------
+def run_test_client(iterations: int, warmup: int) -> dict:
+    """Each route alone, in this process: the app's own cost, no network."""
+    from app import app
+
+    scenario_list = scenarios(app)
+    clients = {None: app.test_client()}
+    for state, (username, _) in ACCOUNTS.items():
+        clients[state] = app.test_client()
+        resp = clients[state].post("/login", data={"username": username, "password": BENCH_PASSWORD})
+        if resp.status_code != 302:
+            raise SystemExit(f"Connexion {username} impossible : lancer `python bench.py seed`.")
+
+    routes = {}
+    for name, state, method, path, form in scenario_list:
+        samples = []
+        for i in range(warmup + iterations):
+            # The test client keeps cookies: an anonymous POST (login_post) gets a
+            # throwaway client, or every later anonymous route would run logged in
+            client = app.test_client() if state is None and method != "GET" else clients[state]
+            start = time.perf_counter()
+            resp = client.open(path, method=method, data=form)
+            resp.get_data()
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                samples.append((elapsed, _queries(resp.headers), resp.status_code))
+        routes[name] = summarize(samples)
+        print(_line(name, routes[name]), flush=True)
+
+    missing = uncovered_endpoints(app, scenario_list)
+    if missing:
+        print(f"\nNon mesurés (écritures) : {', '.join(missing)}")
+    return {"mode": "test-client", "iterations": iterations, "routes": routes}
+
+
+# ---------------- SERVE (gunicorn + concurrent clients) ----------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port: int, proc, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("gunicorn s'est arrêté au démarrage.")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("gunicorn ne répond pas.")
+
+
+def _http(conn, method: str, path: str, cookie: str = "", form=None):
+    headers = {"Cookie": cookie} if cookie else {}
+    body = None
+    if form is not None:
+        body = urlencode(form)
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    return resp
+
+
+def _session_cookie(port: int, username: str) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    resp = _http(conn, "POST", "/login", form={"username": username, "password": BENCH_PASSWORD})
+    conn.close()
+    cookies = [c.split(";", 1)[0] for c in resp.headers.get_all("Set-Cookie") or []]
+    if resp.status != 302 or not cookies:
+        raise SystemExit(f"Connexion {username} impossible : lancer `python bench.py seed`.")
+    return "; ".join(cookies)
+
+
+def run_gunicorn(workers: int, threads: int, concurrency: int, duration: float, env: dict) -> dict:
+    """The app behind gunicorn (gunicorn.conf.py), loaded by concurrent keep-alive clients.
+
+    Every client walks the whole route list in its own random order until
+    duration is over: latencies include queueing in the workers, throughput
+    is for the mix.
+    """
+    from app import app
+
+    scenario_list = scenarios(app)
+    port = _free_port()
+    child_env = {
+        **os.environ, **env,
+        "WEB_CONCURRENCY": str(workers), "GUNICORN_THREADS": str(threads),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "app:app"],
+        env=child_env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        _wait_for(port, proc)
+        cookies = {None: ""}
+        for state, (username, _) in ACCOUNTS.items():
+            cookies[state] = _session_cookie(port, username)
+
+        samples = {name: [] for name, *_ in scenario_list}
+        errors = []
+        lock = threading.Lock()
+        stop_at = time.monotonic() + duration
+
+        def client(seed_value):
+            rng = random.Random(seed_value)
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            local = []
+            while time.monotonic() < stop_at:
+                order = list(scenario_list)
+                rng.shuffle(order)
+                for name, state, method, path, form in order:
+                    start = time.perf_counter()
+                    try:
+                        resp = _http(conn, method, path, cookies[state], form)
+                    except (OSError, http.client.HTTPException) as exc:
+                        errors.append(f"{name}: {exc}")
+                        conn.close()
+                        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                        continue
+                    local.append((name, time.perf_counter() - start, _queries(resp.headers), resp.status))
+            conn.close()
+            with lock:
+                for name, elapsed, queries, status in local:
+                    samples[name].append((elapsed, queries, status))
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        wall = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    routes = {}
+    for name, route_samples in samples.items():
+        if route_samples:
+            routes[name] = summarize(route_samples, wall)
+            print(_line(name, routes[name]), flush=True)
+    total = sum(r["n"] for r in routes.values())
+    print(f"\nTotal : {total} requêtes en {wall:.1f} s = {total / wall:.1f} req/s, {len(errors)} erreur(s)")
+    for err in errors[:10]:
+        print(f"  {err}")
+    return {
+        "mode": "gunicorn", "workers": workers, "threads": threads, "concurrency": concurrency,
+        "duration_s": round(wall, 1), "total_rps": round(total / wall, 1), "errors": len(errors),
+        "routes": routes,
+    }
+
+
+# ---------------- BASELINES ----------------
+def _line(name: str, r: dict) -> str:
+    return (f"{name:24} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+            f"{r['rps']:8.1f} req/s  {r['queries']:5.1f} req. SQL  {r['status']}")
+
+
+def meta(db_url: str, scale) -> dict:
+    return {
+        "dialect": db_url.split(":", 1)[0].split("+", 1)[0],
+        "scale": scale,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "date": datetime.utcnow().replace(microsecond=0).isoformat(),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions against a saved result of the same mode.
+
+    SQL counts must not grow at all (they do not depend on the machine) ;
+    p95 may drift by tolerance (0.25 = +25 %) plus 1 ms of noise.
+    """
+    problems = []
+    if baseline.get("mode") != result.get("mode"):
+        return [f"baseline en mode {baseline.get('mode')}, résultat en mode {result.get('mode')}"]
+    for key in ("dialect", "scale"):
+        if baseline.get("meta", {}).get(key) != result["meta"].get(key):
+            print(f"Attention : {key} différent de la baseline "
+                  f"({baseline.get('meta', {}).get(key)} / {result['meta'].get(key)})")
+    for name, base in baseline.get("routes", {}).items():
+        cur = result["routes"].get(name)
+        if cur is None:
+            continue
+        if cur["queries"] > base["queries"]:
+            problems.append(f"{name}: {base['queries']} -> {cur['queries']} requêtes SQL")
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance) + 1.0:
+            problems.append(f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms")
+        if cur["status"] != base["status"]:
+            problems.append(f"{name}: statut {base['status']} -> {cur['status']}")
+    return problems
+
+
+def _finish(result: dict, args) -> int:
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Résultat enregistré dans {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print("\nRégressions :")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print("\nAucune régression par rapport à la baseline.")
+    return 0
+
+
+def _bench_scale():
+    """Scale recorded in the bench database by `seed` (None if unknown)."""
+    from app import app
+    from models import db, Photo
+
+    with app.app_context():
+        photos = db.session.query(db.func.count(Photo.id)).scalar()
+    return round(photos / FIXTURES["photos"], 3)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Tily Cergy (données synthétiques).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="Remplit une base vide avec les données de test.")
+    p_seed.add_argument("--scale", type=float, default=1.0, help="1.0 = 10k actus, 1k albums, 200k photos, 50k messages.")
+    p_seed.add_argument("--seed", type=int, default=42)
+
+    p_run = sub.add_parser("run", help="Chaque route via le client de test Flask.")
+    p_run.add_argument("--iterations", type=int, default=30)
+    p_run.add_argument("--warmup", type=int, default=3)
+
+    p_serve = sub.add_parser("serve", help="Charge concurrente sur gunicorn multi-workers.")
+    p_serve.add_argument("--workers", type=int, default=2)
+    p_serve.add_argument("--threads", type=int, default=4)
+    p_serve.add_argument("--concurrency", type=int, default=8)
+    p_serve.add_argument("--duration", type=float, default=20.0, help="Secondes.")
+
+    for p in (p_seed, p_run, p_serve):
+        p.add_argument("--db", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DB))
+    for p in (p_run, p_serve):
+        p.add_argument("--keep-cache", action="store_true", help="Garde le cache de réponses (RESPONSE_CACHE_TTL).")
+        p.add_argument("--save", help="Enregistre le résultat (JSON) : baseline.")
+        p.add_argument("--compare", help="Compare à une baseline ; code retour 1 si régression.")
+        p.add_argument("--tolerance", type=float, default=0.25, help="Marge sur le p95 (0.25 = +25 %%).")
+
+    args = parser.parse_args(argv)
+    db_url = args.db.replace("postgres://", "postgresql://")
+    env = configure_env(db_url, getattr(args, "keep_cache", False))
+
+    if args.command == "seed":
+        started = time.perf_counter()
+        counts = seed(args.scale, args.seed)
+        print(f"{counts} en {time.perf_counter() - started:.1f} s")
+        return 0
+
+    if args.command == "run":
+        result = run_test_client(args.iterations, args.warmup)
+    else:
+        result = run_gunicorn(args.workers, args.threads, args.concurrency, args.duration, env)
+    result["meta"] = meta(db_url, _bench_scale())
+    return _finish(result, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
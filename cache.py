@@ -0,0 +1,309 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, request, session
+from flask_login import UserMixin, current_user
+from werkzeug.http import is_resource_modified
+
+from models import db, User, role_is_staff
+
+# Endpoints whose HTML depends on NewsPost rows
+NEWS_ENDPOINTS = ("home", "actus", "seo_page")
+
+
+class LRUCache:
+    """In-process cache: TTL + max entries, least recently used evicted first."""
+
+    def __init__(self, max_entries: int = 512, default_ttl: int = 60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: int = 0):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache:
+    """Cache shared by every worker, on top of a Redis-compatible client.
+
+    Any object exposing get/set(ex=)/delete/scan_iter works, so a local
+    stand-in (fakeredis, a small dict wrapper...) can replace Redis.
+    """
+
+    def __init__(self, client, namespace: str = "tily:", default_ttl: int = 60):
+        self.client = client
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def get(self, key):
+        raw = self.client.get(self.namespace + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: int = 0):
+        self.client.set(self.namespace + key, json.dumps(value), ex=ttl or self.default_ttl)
+
+    def delete(self, key):
+        self.client.delete(self.namespace + key)
+
+    def delete_prefix(self, prefix: str):
+        for key in self.client.scan_iter(match=f"{self.namespace}{prefix}*"):
+            self.client.delete(key)
+
+    def clear(self):
+        self.delete_prefix("")
+
+
+def init_response_cache(app, backend=None):
+    """Attach the response cache to the app (RESPONSE_CACHE_TTL=0 disables it)."""
+    ttl = app.config.get("RESPONSE_CACHE_TTL", 60)
+    if backend is None and ttl <= 0:
+        app.extensions["response_cache"] = None
+        return None
+
+    if backend is None:
+        url = app.config.get("RESPONSE_CACHE_URL", "")
+        if url:
+            import redis  # optional dependency, only needed for the shared backend
+
+            backend = SharedCache(redis.Redis.from_url(url), default_ttl=ttl)
+        else:
+            backend = LRUCache(app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 512), ttl)
+
+    app.extensions["response_cache"] = backend
+    return backend
+
+
+def get_response_cache():
+    return current_app.extensions.get("response_cache")
+
+
+def login_state() -> str:
+    """Part of the cache key: pages differ by role, not by user."""
+    if not current_user.is_authenticated:
+        return "anon"
+    if current_user.role == "ADMIN":
+        return "admin"
+    return "staff" if current_user.is_staff() else "member"
+
+
+def page_key(endpoint: str) -> str:
+    # full_path covers the slug and the ?cursor= of the news feed ; the page
+    # version (set by conditional_page) retires entries written by other workers
+    version = g.get("page_version", "")
+    return f"page:{endpoint}:{login_state()}:{request.host}{request.full_path}:{version}"
+
+
+def cached_page(view):
+    """Serve a whole GET response from the cache, store it on a miss."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        # Pending flash messages are rendered in the page: never share them
+        if cache is None or request.method != "GET" or session.get("_flashes"):
+            return view(*args, **kwargs)
+
+        key = page_key(request.endpoint)
+        hit = cache.get(key)
+        if hit is not None:
+            resp = current_app.response_class(
+                base64.b64decode(hit["body"]), status=hit["status"], headers=hit["headers"]
+            )
+            resp.headers["X-Cache"] = "HIT"
+            return resp
+
+        resp = current_app.make_response(view(*args, **kwargs))
+        if resp.status_code == 200 and not resp.direct_passthrough and "Set-Cookie" not in resp.headers:
+            cache.set(key, {
+                "body": base64.b64encode(resp.get_data()).decode("ascii"),
+                "status": resp.status_code,
+                "headers": [(k, v) for k, v in resp.headers.items() if k.lower() != "content-length"],
+            })
+        resp.headers["X-Cache"] = "MISS"
+        return resp
+
+    return wrapper
+
+
+def invalidate_news_pages():
+    """Drop every cached page that lists NewsPost rows (call after commit)."""
+    cache = get_response_cache()
+    if cache is None:
+        return
+    for endpoint in NEWS_ENDPOINTS:
+        cache.delete_prefix(f"page:{endpoint}:")
+
+
+# ---------------- CONDITIONAL GET (ETag / Last-Modified) ----------------
+def init_build_stamp(app):
+    """Deploy identity mixed into every ETag: templates may change the HTML.
+
+    BUILD_ID (e.g. the git commit) when set, else the newest template mtime,
+    which is the same in every worker of a deploy.
+    """
+    built_at = 0.0
+    for root, _, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+        for name in files:
+            built_at = max(built_at, os.path.getmtime(os.path.join(root, name)))
+    built_at = datetime.fromtimestamp(int(built_at), tz=timezone.utc)
+    build_id = app.config.get("BUILD_ID") or built_at.isoformat()
+    app.extensions["build_stamp"] = (build_id, built_at)
+
+
+def static_version():
+    """Validator of pages that only change with a deploy."""
+    return ("", None)
+
+
+def conditional_page(version):
+    """Answer If-None-Match / If-Modified-Since with 304 before the view runs.
+
+    version() returns (token, last_modified or None) from a cheap query ;
+    the ETag covers the token, the deploy, the login state and the URL.
+    Put it above cached_page so a 304 skips the cache lookup too.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are rendered in the page: always a full 200
+            if request.method != "GET" or session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            build_id, built_at = current_app.extensions["build_stamp"]
+            token, last_modified = version()
+            last_modified = max(built_at, (last_modified or built_at).replace(tzinfo=timezone.utc))
+            etag = hashlib.sha1(
+                f"{build_id}|{token}|{login_state()}|{request.host}{request.full_path}".encode()
+            ).hexdigest()
+            g.page_version = etag
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = current_app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+
+            resp.set_etag(etag)
+            resp.last_modified = last_modified
+            # Stored by browsers / the service worker, but revalidated every time
+            resp.cache_control.no_cache = True
+            if current_user.is_authenticated:
+                resp.cache_control.private = True
+            resp.vary.add("Cookie")
+            return resp
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------- USER SNAPSHOTS (Flask-Login) ----------------
+class UserSnapshot(UserMixin):
+    """Identity + role of a logged-in user, cached between requests.
+
+    Enough for templates and permission checks ; load the User row
+    (db.session.get) before touching the password.
+    """
+
+    def __init__(self, data: dict):
+        self.id = data["id"]
+        self.username = data["username"]
+        self.role = data["role"]
+        self.role_requested = data["role_requested"]
+        self.role_validated = data["role_validated"]
+
+    def is_staff(self) -> bool:
+        return role_is_staff(self.role, self.role_validated)
+
+
+def init_user_cache(app, backend=None):
+    """Cache used by load_user() (USER_CACHE_TTL=0 disables it)."""
+    ttl = app.config.get("USER_CACHE_TTL", 60)
+    if backend is None and ttl <= 0:
+        app.extensions["user_cache"] = None
+        return None
+
+    if backend is None:
+        url = app.config.get("USER_CACHE_URL", "")
+        if url:
+            import redis  # optional dependency, only needed for the shared backend
+
+            backend = SharedCache(redis.Redis.from_url(url), namespace="tily:user:", default_ttl=ttl)
+        else:
+            backend = LRUCache(app.config.get("USER_CACHE_MAX_ENTRIES", 1024), ttl)
+
+    app.extensions["user_cache"] = backend
+    return backend
+
+
+def load_cached_user(user_id: int):
+    """user_loader: snapshot from the cache, the database only on a miss."""
+    cache = current_app.extensions.get("user_cache")
+    key = f"user:{user_id}"
+    data = cache.get(key) if cache is not None else None
+
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        if cache is None:
+            return user
+        data = {
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+            "role_requested": user.role_requested,
+            "role_validated": bool(user.role_validated),
+        }
+        cache.set(key, data)
+
+    return UserSnapshot(data)
+
+
+def invalidate_user(user_id: int):
+    """Call after committing a change of role or credentials."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is not None:
+        cache.delete(f"user:{user_id}")
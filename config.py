@@ -5,10 +5,99 @@ class Config:
     # Render sometimes provides postgres:// -> SQLAlchemy expects postgresql://
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///instance/app.db").replace("postgres://", "postgresql://")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional read-only connection (replica) for public pages, same format
+    DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "").replace("postgres://", "postgresql://")
+    # After a write, the user's read_only pages read the primary this long (replica lag)
+    READ_AFTER_WRITE_SECONDS = int(os.getenv("READ_AFTER_WRITE_SECONDS", "10"))
+
+    # Connection pool of each gunicorn worker (see database.pool_options and
+    # gunicorn.conf.py). DB_POOL_SIZE=0 -> one connection per thread.
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "2"))
+    GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "2"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))  # seconds
+
+    # Token buckets on login/register POSTs (per client IP and per username),
+    # checked before any password hashing. RATE_LIMIT_URL shares them.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes", "y")
+    RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")  # e.g. redis://localhost:6379/0
+    # A *_PER_MINUTE of 0 turns that bucket off
+    AUTH_IP_BURST = int(os.getenv("AUTH_IP_BURST", "10"))
+    AUTH_IP_PER_MINUTE = float(os.getenv("AUTH_IP_PER_MINUTE", "10"))
+    AUTH_USER_BURST = int(os.getenv("AUTH_USER_BURST", "5"))
+    AUTH_USER_PER_MINUTE = float(os.getenv("AUTH_USER_PER_MINUTE", "5"))
 
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "static/uploads")
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
 
+    # Batch photo upload (/album/<id>/photos)
+    BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+    BATCH_MAX_CONTENT_LENGTH = int(os.getenv("BATCH_MAX_CONTENT_MB", "200")) * 1024 * 1024
+    UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))  # threads resizing / sending files
+
+    # Resumable uploads (/upload): declared size checked up front, body sent in chunks
+    UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "10"))
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "512")) * 1024
+    UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", "40000000"))  # checked on the first chunk
+    UPLOAD_SESSION_FOLDER = os.getenv("UPLOAD_SESSION_FOLDER", "instance/upload_sessions")
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))  # seconds before an abandoned upload is purged
+
+    # Pagination (keyset) of the news feed
+    NEWS_PER_PAGE = int(os.getenv("NEWS_PER_PAGE", "12"))
+    PHOTOS_PER_PAGE = int(os.getenv("PHOTOS_PER_PAGE", "60"))
+    ADMIN_PER_PAGE = int(os.getenv("ADMIN_PER_PAGE", "20"))
+    # Moderation queue: pending photos per page, ids per bulk approve / reject
+    MODERATION_PER_PAGE = int(os.getenv("MODERATION_PER_PAGE", "100"))
+    MODERATION_MAX_IDS = int(os.getenv("MODERATION_MAX_IDS", "500"))
+    # Pages frozen to HTML by `flask --app app freeze`, refreshed when news change
+    PRERENDER_FOLDER = os.getenv("PRERENDER_FOLDER", "instance/prerendered")
+    # No frozen pages for this deploy (freeze not run): render them in a background thread
+    PRERENDER_ON_MISS = os.getenv("PRERENDER_ON_MISS", "true").lower() == "true"
+
+    # Admin CSV / NDJSON exports: rows fetched and written per chunk
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+    # Full-text search (/recherche): ranked results, offset pages capped
+    SEARCH_PER_PAGE = int(os.getenv("SEARCH_PER_PAGE", "20"))
+    SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "20"))
+
+    # Part of every ETag (conditional GET): changes with each deploy.
+    # Defaults to the newest template mtime when unset.
+    BUILD_ID = os.getenv("BUILD_ID", os.getenv("RENDER_GIT_COMMIT", ""))
+
+    # Instrumentation: Server-Timing header on every response, warning log
+    # (with the SQL) above SLOW_REQUEST_MS (0 = off), /metrics for a scraper
+    # sending "Authorization: Bearer <METRICS_TOKEN>" or a logged-in admin
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes", "y")
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # JSON API (/api/v1): page size, and how recent a change must be before
+    # the delta sync (?since=) returns it, in seconds
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+    API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+    API_SYNC_LAG = int(os.getenv("API_SYNC_LAG", "2"))
+
+    # Service worker (/sw.js): runtime cache sizes, in entries ; images up to
+    # SW_PRECACHE_MAX_KB are downloaded at install
+    SW_MAX_PAGES = int(os.getenv("SW_MAX_PAGES", "30"))
+    SW_MAX_IMAGES = int(os.getenv("SW_MAX_IMAGES", "80"))
+    SW_PRECACHE_MAX_KB = int(os.getenv("SW_PRECACHE_MAX_KB", "150"))
+
+    # Whole-response cache of public pages (TTL in seconds, 0 = disabled).
+    # Without RESPONSE_CACHE_URL each worker keeps its own LRU: invalidation
+    # only reaches the worker that handled the write, others expire by TTL.
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+    RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")  # e.g. redis://localhost:6379/0
+
+    # Flask-Login user snapshots (identity + role), TTL in seconds, 0 = disabled
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+    USER_CACHE_URL = os.getenv("USER_CACHE_URL", RESPONSE_CACHE_URL)
+
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
     STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY", "")
     DONATION_EXTERNAL_URL = os.getenv("DONATION_EXTERNAL_URL", "")
@@ -21,13 +110,29 @@ class Config:
     CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET", "")
     CLOUDINARY_FOLDER = os.getenv("CLOUDINARY_FOLDER", "tily-cergy-fandresena")
 
+    # Cloudinary transfers done by the media worker instead of the request
+    # (`flask --app app media-worker`, or a thread in each web worker)
+    MEDIA_QUEUE_ENABLED = os.getenv("MEDIA_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes", "y")
+    MEDIA_WORKER_IN_PROCESS = os.getenv("MEDIA_WORKER_IN_PROCESS", "false").lower() in ("1", "true", "yes", "y")
+    MEDIA_WORKER_POLL = float(os.getenv("MEDIA_WORKER_POLL", "5"))
+    MEDIA_SPOOL_FOLDER = os.getenv("MEDIA_SPOOL_FOLDER", "instance/spool")
+    MEDIA_JOB_MAX_ATTEMPTS = int(os.getenv("MEDIA_JOB_MAX_ATTEMPTS", "5"))
+    MEDIA_JOB_BACKOFF = int(os.getenv("MEDIA_JOB_BACKOFF", "30"))  # seconds, doubled on each retry
+
     # Contact (optional)
     CONTACT_TO_EMAIL = os.getenv("CONTACT_TO_EMAIL", "")
 
-# SMTP for contact emails (optional)
-SMTP_HOST = os.getenv("SMTP_HOST", "")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER = os.getenv("SMTP_USER", "")
-SMTP_PASS = os.getenv("SMTP_PASS", "")
-SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
-SMTP_TLS = os.getenv("SMTP_TLS", "true").lower() in ("1", "true", "yes", "y")
+    # SMTP for contact emails (optional) - sent from the outbox by the mail
+    # sender (`flask --app app mail-sender`, or a thread in each web worker)
+    SMTP_HOST = os.getenv("SMTP_HOST", "")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USER = os.getenv("SMTP_USER", "")
+    SMTP_PASS = os.getenv("SMTP_PASS", "")
+    SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+    SMTP_TLS = os.getenv("SMTP_TLS", "true").lower() in ("1", "true", "yes", "y")
+    SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "20"))
+    MAIL_SENDER_IN_PROCESS = os.getenv("MAIL_SENDER_IN_PROCESS", "false").lower() in ("1", "true", "yes", "y")
+    MAIL_SENDER_POLL = float(os.getenv("MAIL_SENDER_POLL", "10"))
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+    MAIL_BACKOFF = int(os.getenv("MAIL_BACKOFF", "60"))  # seconds, doubled on each retry
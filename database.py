@@ -0,0 +1,100 @@
+import time
+from functools import wraps
+
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+
+# Bind key of the optional read-only connection (DATABASE_READ_URL)
+READ_BIND = "read"
+# Flask session key: until this timestamp, read_only views of this user read the primary
+PRIMARY_UNTIL = "db_primary_until"
+
+
+def pool_options(cfg: dict, url: str) -> dict:
+    """Engine options sized for one gunicorn worker process.
+
+    Each worker holds its own pool: one connection per request thread, plus
+    the in-process media / mail threads, plus a small overflow. The total
+    (WEB_CONCURRENCY x pool) must stay under the database connection limit.
+    """
+    options = {
+        # Render drops idle Postgres connections: test before use, renew old ones
+        "pool_pre_ping": True,
+        "pool_recycle": cfg.get("DB_POOL_RECYCLE", 280),
+    }
+    if url.startswith("sqlite"):
+        return options  # file / memory pools of SQLite take no size options
+
+    background = int(bool(cfg.get("MEDIA_WORKER_IN_PROCESS"))) + int(bool(cfg.get("MAIL_SENDER_IN_PROCESS")))
+    options.update(
+        pool_size=cfg.get("DB_POOL_SIZE") or cfg.get("GUNICORN_THREADS", 4) + background,
+        max_overflow=cfg.get("DB_MAX_OVERFLOW", 2),
+        pool_timeout=cfg.get("DB_POOL_TIMEOUT", 10),
+    )
+    return options
+
+
+def configure_engines(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS (call before db.init_app)."""
+    cfg = app.config
+    cfg.setdefault("SQLALCHEMY_ENGINE_OPTIONS", pool_options(cfg, cfg["SQLALCHEMY_DATABASE_URI"]))
+
+    read_url = cfg.get("DATABASE_READ_URL", "")
+    if read_url:
+        binds = dict(cfg.get("SQLALCHEMY_BINDS") or {})
+        binds[READ_BIND] = {"url": read_url, **pool_options(cfg, read_url)}
+        cfg["SQLALCHEMY_BINDS"] = binds
+
+
+class RoutingSession(Session):
+    """Sends the SELECTs of read_only views to the read bind when configured.
+
+    Flushes (writes) always go to the primary database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("db_read_only"):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_read_your_writes(app):
+    """After a write request, pin the user's reads to the primary for a while.
+
+    Staff actions (approve, delete...) redirect to read_only pages: with a
+    lagging replica the user would not see what they just changed. Any
+    POST / PUT / PATCH / DELETE of a logged-in user counts as a write.
+    """
+    if not app.config.get("DATABASE_READ_URL"):
+        return
+
+    @app.after_request
+    def pin_primary(response):
+        from flask_login import current_user
+
+        if request.method not in ("GET", "HEAD", "OPTIONS") and current_user.is_authenticated:
+            session[PRIMARY_UNTIL] = time.time() + app.config.get("READ_AFTER_WRITE_SECONDS", 10)
+        return response
+
+
+def read_only(view):
+    """Route the view's queries to DATABASE_READ_URL (primary when unset).
+
+    The replica may lag a little behind: reads go to the primary for
+    READ_AFTER_WRITE_SECONDS after the same user wrote something, so a
+    page never shows data older than the user's own last change.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get(PRIMARY_UNTIL, 0) > time.time():
+            return view(*args, **kwargs)
+        g.db_read_only = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.db_read_only = False
+
+    return wrapper
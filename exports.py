@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+
+from models import db, User, Album, Photo, ContactMessage
+
+# Admin exports streamed row by row: the query runs with yield_per (server-side
+# cursor on PostgreSQL, incremental fetch on SQLite) and the response is a
+# generator, so memory stays flat whatever the size of the table.
+exports = Blueprint("exports", __name__, url_prefix="/admin/export")
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Spreadsheets run cells starting with these as formulas (contact form input)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _photo_count():
+    return (
+        select(func.count(Photo.id)).where(Photo.album_id == Album.id).correlate(Album).scalar_subquery()
+    )
+
+
+# dataset -> (date column, columns) ; password hashes are never exported
+DATASETS = {
+    "messages": (ContactMessage.created_at, lambda: [
+        ContactMessage.id, ContactMessage.created_at, ContactMessage.name, ContactMessage.email,
+        ContactMessage.subject, ContactMessage.message, ContactMessage.is_read,
+    ]),
+    "users": (User.created_at, lambda: [
+        User.id, User.created_at, User.username, User.role, User.role_requested, User.role_validated,
+    ]),
+    "albums": (Album.created_at, lambda: [
+        Album.id, Album.created_at, Album.updated_at, Album.title, Album.description, Album.approved,
+        _photo_count().label("photos"),
+    ]),
+    "photos": (Photo.created_at, lambda: [
+        Photo.id, Photo.created_at, Photo.album_id, Album.title.label("album"), Photo.caption, Photo.approved,
+        Photo.upload_status, Photo.file_path, Photo.thumb_path, Photo.medium_path, Photo.width, Photo.height,
+        Photo.cloudinary_public_id,
+    ]),
+}
+
+
+def parse_day(raw: str):
+    """'YYYY-MM-DD' -> date, None when empty ; ValueError when invalid."""
+    raw = (raw or "").strip()
+    return date.fromisoformat(raw) if raw else None
+
+
+def export_query(dataset: str, start=None, end=None):
+    """SELECT of dataset, created between start and end (days, both included), by id."""
+    date_col, columns = DATASETS[dataset]
+    columns = columns()
+    stmt = select(*columns)
+    if dataset == "photos":
+        stmt = stmt.join(Album, Album.id == Photo.album_id)
+    if start:
+        stmt = stmt.where(date_col >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(date_col < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return stmt.order_by(columns[0])
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _json_value(value):
+    return value.isoformat() + "Z" if isinstance(value, datetime) else value
+
+
+def stream_rows(stmt, fmt: str, chunk_size: int):
+    """Yield the export text, one chunk of rows at a time."""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    keys = list(result.keys())
+    buf = io.StringIO()
+
+    if fmt == "csv":
+        writer = csv.writer(buf, delimiter=";", lineterminator="\r\n")
+        buf.write("\ufeff")  # BOM: Excel reads the accents as UTF-8
+        writer.writerow(keys)
+        for rows in result.partitions():
+            writer.writerows([_cell(v) for v in row] for row in rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue()
+        return
+
+    for rows in result.partitions():
+        for row in rows:
+            buf.write(json.dumps({k: _json_value(v) for k, v in zip(keys, row)}, ensure_ascii=False))
+            buf.write("\n")
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+@exports.get("/<dataset>.<fmt>")
+@login_required
+def export(dataset, fmt):
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD (optional, on the creation date)."""
+    if current_user.role != "ADMIN":
+        return "", 403
+    if dataset not in DATASETS or fmt not in FORMATS:
+        abort(404)
+    try:
+        start = parse_day(request.args.get("from"))
+        end = parse_day(request.args.get("to"))
+    except ValueError:
+        return jsonify(error="date invalide (AAAA-MM-JJ)"), 400
+
+    stmt = export_query(dataset, start, end)
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 1000)
+    resp = Response(stream_with_context(stream_rows(stmt, fmt, chunk_size)), mimetype=FORMATS[fmt])
+    suffix = "".join(f"_{d.isoformat()}" for d in (start, end) if d)
+    resp.headers["Content-Disposition"] = f'attachment; filename="tily-{dataset}{suffix}.{fmt}"'
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"  # proxies pass chunks through as they come
+    return resp
@@ -0,0 +1,17 @@
+import os
+
+# Read by gunicorn at startup. The SQLAlchemy pool of each worker is sized
+# from the same variables (database.pool_options), keep them in sync.
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def post_worker_init(worker):
+    # In-process media worker / mail sender (single-instance deploys): started
+    # in each web worker only, not by the flask CLI commands importing app
+    from app import app, start_background_threads
+
+    start_background_threads(app)
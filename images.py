@@ -0,0 +1,164 @@
+import hashlib
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from PIL import Image, ImageOps
+
+from models import THUMB_WIDTH, MEDIUM_WIDTH
+
+# Largest side kept for the "full" image (phones send 4000px+ JPEGs)
+FULL_MAX_SIDE = 2560
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Pillow format -> extension of the stored full image
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# A blob written or reused this recently may belong to an upload whose row is
+# not committed yet: reference-counted deletes leave it alone
+BLOB_FRESH_SECONDS = 600
+
+# A blob lock older than this was left by a killed worker
+BLOB_LOCK_STALE = 60
+
+
+def _fit_width(img, width: int):
+    if img.width <= width:
+        return img.copy()
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def _save(img, path: str, fmt: str):
+    # Written under a temporary name then renamed: readers never see half a file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        _encode(img, tmp_path, fmt)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _encode(img, path: str, fmt: str):
+    if fmt == "JPEG":
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+        img.save(path, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        img.save(path, "PNG", optimize=True)
+
+
+def hash_stream(stream, chunk_size: int = 64 * 1024) -> str:
+    """sha256 of an upload, read by chunks ; rewinds the stream."""
+    h = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def blob_paths(upload_folder: str, digest: str, ext: str) -> dict:
+    """Content-addressed layout: <folder>/ab/cd/<sha256>{ext,.thumb.webp,.medium.webp}.
+
+    Two levels of 256 shards keep every directory small.
+    """
+    shard = os.path.join(upload_folder, digest[:2], digest[2:4])
+    base = os.path.join(shard, digest)
+    return {
+        "dir": shard,
+        "full": base + ext,
+        "thumb": base + ".thumb.webp",
+        "medium": base + ".medium.webp",
+    }
+
+
+@contextmanager
+def blob_lock(full_path: str):
+    """O_EXCL lock file next to a blob, held while it is reused, written or removed.
+
+    Waits for the holder (an upload encoding the derivatives, a delete) and
+    breaks a lock left by a killed worker after BLOB_LOCK_STALE.
+    """
+    path = os.path.splitext(full_path)[0] + ".lock"
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) >= BLOB_LOCK_STALE:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def touch_blob(paths: dict):
+    """Mark a reused blob as fresh (see BLOB_FRESH_SECONDS)."""
+    for key in ("full", "thumb", "medium"):
+        os.utime(paths[key])
+
+
+def blob_is_fresh(full_path: str) -> bool:
+    return time.time() - os.path.getmtime(full_path) < BLOB_FRESH_SECONDS
+
+
+def image_size(path: str) -> dict:
+    """Pixel size read from the file header (no decode)."""
+    with Image.open(path) as img:
+        return {"width": img.width, "height": img.height}
+
+
+def is_image(stream) -> bool:
+    """Cheap header check (no full decode) ; rewinds the stream."""
+    try:
+        Image.open(stream).verify()
+        return True
+    except Exception:
+        return False
+    finally:
+        stream.seek(0)
+
+
+def open_image(stream):
+    """Open an upload with EXIF orientation applied. Raises on non-images."""
+    img = Image.open(stream)
+    img.load()
+    fmt = img.format
+    img = ImageOps.exif_transpose(img)
+    img.format = fmt  # lost by the transpose copy, used to pick the stored format
+    return img
+
+
+def write_derivatives(img, full_path: str, thumb_path: str, medium_path: str) -> dict:
+    """Write full (same format as upload, resized) + thumb/medium (WebP).
+
+    Returns the pixel dimensions of the full image.
+    """
+    ext = os.path.splitext(full_path)[1].lower()
+    full_fmt = {".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}.get(ext, "PNG")
+
+    full = img.copy()
+    full.thumbnail((FULL_MAX_SIDE, FULL_MAX_SIDE), Image.LANCZOS)
+    _save(full, full_path, full_fmt)
+
+    for path, width in ((thumb_path, THUMB_WIDTH), (medium_path, MEDIUM_WIDTH)):
+        _save(_fit_width(full, width), path, "WEBP")
+
+    return {"width": full.width, "height": full.height}
@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from models import db
+
+# A "running" row whose worker died is picked up again after this delay
+STALE_LOCK = timedelta(minutes=10)
+
+
+def due_filter(model, now):
+    """Rows ready to run: pending and due, or running with a stale lock.
+
+    model needs status / run_after / locked_at / attempts columns.
+    """
+    return or_(
+        and_(model.status == "pending", model.run_after <= now),
+        and_(model.status == "running", model.locked_at < now - STALE_LOCK),
+    )
+
+
+def claim_due(model, limit: int = 1):
+    """Atomically mark up to limit due rows as running and return them.
+
+    Each row is taken with a conditional UPDATE, so concurrent workers never
+    get the same row (works the same on SQLite and PostgreSQL).
+    """
+    now = datetime.utcnow()
+    due = due_filter(model, now)
+    candidates = model.query.filter(due).order_by(model.run_after, model.id).limit(limit * 2).all()
+
+    claimed = []
+    for row in candidates:
+        if len(claimed) >= limit:
+            break
+        res = db.session.execute(
+            update(model)
+            .where(model.id == row.id, model.status == row.status, due)
+            .values(status="running", locked_at=now, attempts=model.attempts + 1)
+        )
+        db.session.commit()
+        if res.rowcount == 1:
+            db.session.refresh(row)
+            claimed.append(row)
+    return claimed
+
+
+def schedule_retry(row, error: str, max_attempts: int, backoff: int) -> bool:
+    """Record a failure: back to pending with exponential backoff, or failed.
+
+    Returns True when the row gave up (status "failed"). Caller commits.
+    """
+    row.last_error = str(error)[:2000]
+    if row.attempts >= max_attempts:
+        row.status = "failed"
+        return True
+    delay = min(backoff * 2 ** (row.attempts - 1), 3600)
+    row.status = "pending"
+    row.run_after = datetime.utcnow() + timedelta(seconds=delay)
+    return False
+
+
+def start_background_loop(app, name: str, loop, *args):
+    """Run loop(*args) in a daemon thread with an app context.
+
+    Used for single-instance deploys where no separate worker process runs.
+    """
+
+    def target():
+        with app.app_context():
+            loop(*args)
+
+    t = threading.Thread(target=target, name=name, daemon=True)
+    t.start()
+    return t
+
+
+def poll_forever(run_once, poll_interval: float, logger, stop_event=None):
+    """Call run_once() until stop_event is set ; sleep when it did nothing."""
+    while stop_event is None or not stop_event.is_set():
+        try:
+            processed = run_once()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Worker loop error")
+            processed = 0
+        if not processed:
+            time.sleep(poll_interval)
@@ -0,0 +1,121 @@
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+
+from flask import current_app
+
+from job_queue import claim_due, poll_forever, schedule_retry, start_background_loop
+from metrics import timed_call
+from models import db, EmailOutbox
+
+
+def mail_enabled() -> bool:
+    cfg = current_app.config
+    return bool(cfg.get("SMTP_HOST") and cfg.get("CONTACT_TO_EMAIL"))
+
+
+def _header(value: str) -> str:
+    # Form input ends up in headers: no line breaks (header injection)
+    return " ".join(value.splitlines()).strip()
+
+
+def enqueue_contact_email(cm):
+    """Queue the copy of a ContactMessage for CONTACT_TO_EMAIL (caller commits)."""
+    body = (
+        "Nouveau message via le formulaire de contact\n\n"
+        f"Nom : {cm.name}\n"
+        f"Email : {cm.email}\n"
+        f"Sujet : {cm.subject}\n\n"
+        f"{cm.message}\n"
+    )
+    db.session.add(EmailOutbox(
+        contact_message=cm,
+        to_addr=current_app.config["CONTACT_TO_EMAIL"],
+        reply_to=_header(cm.email),
+        subject=_header(f"[Contact] {cm.subject}")[:200],
+        body=body,
+    ))
+
+
+def default_smtp_factory():
+    """One SMTP connection for the whole batch (STARTTLS + login if configured)."""
+    cfg = current_app.config
+    conn = smtplib.SMTP(cfg["SMTP_HOST"], cfg.get("SMTP_PORT", 587), timeout=cfg.get("SMTP_TIMEOUT", 20))
+    if cfg.get("SMTP_TLS"):
+        conn.starttls()
+    if cfg.get("SMTP_USER"):
+        conn.login(cfg["SMTP_USER"], cfg.get("SMTP_PASS", ""))
+    return conn
+
+
+def _build(mail) -> EmailMessage:
+    cfg = current_app.config
+    msg = EmailMessage()
+    msg["From"] = cfg.get("SMTP_FROM") or cfg.get("SMTP_USER") or cfg["CONTACT_TO_EMAIL"]
+    msg["To"] = mail.to_addr
+    if mail.reply_to:
+        msg["Reply-To"] = mail.reply_to
+    msg["Subject"] = mail.subject
+    msg.set_content(mail.body)
+    return msg
+
+
+def send_pending(smtp_factory=None, limit: int = 0) -> int:
+    """Send one batch of due emails over a single SMTP connection.
+
+    Returns how many rows were claimed (0 = outbox empty).
+    """
+    cfg = current_app.config
+    mails = claim_due(EmailOutbox, limit=limit or cfg.get("MAIL_BATCH_SIZE", 20))
+    if not mails:
+        return 0
+
+    max_attempts = cfg.get("MAIL_MAX_ATTEMPTS", 6)
+    backoff = cfg.get("MAIL_BACKOFF", 60)
+
+    try:
+        with timed_call("smtp"):
+            conn = (smtp_factory or default_smtp_factory)()
+    except Exception as e:
+        current_app.logger.exception("SMTP connection failed")
+        for mail in mails:
+            schedule_retry(mail, e, max_attempts, backoff)
+        db.session.commit()
+        return len(mails)
+
+    try:
+        for mail in mails:
+            try:
+                with timed_call("smtp"):
+                    conn.send_message(_build(mail))
+                mail.status = "sent"
+                mail.sent_at = datetime.utcnow()
+                mail.last_error = ""
+            except Exception as e:
+                current_app.logger.exception("Email %s failed (attempt %s)", mail.id, mail.attempts)
+                schedule_retry(mail, e, max_attempts, backoff)
+                if isinstance(e, smtplib.SMTPServerDisconnected):
+                    # The rest of the batch is retried with a fresh connection
+                    for other in mails:
+                        if other.status == "running":
+                            schedule_retry(other, e, max_attempts, backoff)
+                    break
+            db.session.commit()
+    finally:
+        try:
+            conn.quit()
+        except Exception:
+            pass
+    db.session.commit()
+    return len(mails)
+
+
+def run_sender(smtp_factory=None, poll_interval: float = 10.0, stop_event=None):
+    poll_forever(lambda: send_pending(smtp_factory), poll_interval, current_app.logger, stop_event)
+
+
+def start_sender_thread(app, smtp_factory=None):
+    """In-process sender for single-instance deploys."""
+    return start_background_loop(
+        app, "mail-sender", run_sender, smtp_factory, app.config.get("MAIL_SENDER_POLL", 10.0)
+    )
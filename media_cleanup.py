@@ -0,0 +1,89 @@
+import os
+
+import cloudinary.api
+import cloudinary.uploader
+from flask import current_app
+from sqlalchemy import select
+
+from images import blob_is_fresh, blob_lock
+from models import db, NewsPost, Photo
+from media_queue import media_queue_enabled, enqueue_delete
+from metrics import timed_call
+
+# Deleting stored images, one row (delete_photo / delete_post) or a whole
+# batch (moderation queue). Local files are content-addressed and shared
+# between identical uploads: a blob is only removed once no row uses it, and
+# not while an upload of the same bytes may still be committing (images.py).
+
+# Cloudinary Admin API: at most 100 public ids per delete_resources call
+CLOUDINARY_BATCH = 100
+
+
+def referenced_images(urls) -> set:
+    """URLs among urls still stored in a Photo or NewsPost row (two grouped queries)."""
+    urls = {u for u in urls if u}
+    if not urls:
+        return set()
+    used = set(db.session.scalars(select(Photo.file_path).where(Photo.file_path.in_(urls)).distinct()))
+    used |= set(db.session.scalars(select(NewsPost.image_path).where(NewsPost.image_path.in_(urls)).distinct()))
+    return used
+
+
+def _destroy_cloudinary(public_ids: list):
+    if media_queue_enabled():
+        for public_id in public_ids:
+            enqueue_delete(public_id)  # committed with the caller's transaction
+        return
+    try:
+        if len(public_ids) == 1:
+            with timed_call("cloudinary"):
+                cloudinary.uploader.destroy(public_ids[0], resource_type="image")
+            return
+        for start in range(0, len(public_ids), CLOUDINARY_BATCH):
+            with timed_call("cloudinary"):
+                cloudinary.api.delete_resources(public_ids[start:start + CLOUDINARY_BATCH], resource_type="image")
+    except Exception:
+        current_app.logger.exception("Cloudinary delete failed")
+
+
+def delete_uploaded_images(images) -> int:
+    """Best-effort delete of [(url, public_id, variant_paths)] ; returns local files removed.
+
+    Call after deleting / flushing the rows and before commit: queued
+    Cloudinary deletes join the transaction, and the reference check no
+    longer sees the deleted rows. variant_paths = local resized copies.
+    """
+    images = list(images)
+    local = images
+    if current_app.config.get("CLOUDINARY_CLOUD_NAME"):
+        public_ids = [public_id for _, public_id, _ in images if public_id]
+        if public_ids:
+            _destroy_cloudinary(public_ids)
+        local = [image for image in images if not image[1]]
+
+    used = referenced_images(url for url, _, _ in local)
+    removed = 0
+    for url, _, variant_paths in local:
+        if not url or url in used:
+            continue
+        used.add(url)  # the same blob twice in the batch: remove it once
+        full_path = _local_path(url)
+        if not full_path or not os.path.exists(full_path):
+            continue
+        try:
+            with blob_lock(full_path):
+                if blob_is_fresh(full_path):
+                    continue
+                for path in filter(None, map(_local_path, (url, *variant_paths))):
+                    if os.path.exists(path):
+                        os.remove(path)
+                        removed += 1
+        except Exception:
+            current_app.logger.exception("Local file delete failed")
+    return removed
+
+
+def _local_path(url: str) -> str:
+    """static/... path of a local image URL, "" for anything else."""
+    path = url.lstrip("/") if url and url.startswith("/") else ""
+    return path if path.startswith("static/") else ""
@@ -0,0 +1,208 @@
+import os
+import shutil
+import uuid
+
+import cloudinary
+import cloudinary.uploader
+from flask import current_app
+from PIL import Image
+
+from job_queue import claim_due, poll_forever, schedule_retry, start_background_loop
+from metrics import timed_call
+from models import db, MediaJob, NewsPost, Photo, THUMB_WIDTH, MEDIUM_WIDTH
+from prerender import news_changed
+
+# target_type -> (model, column holding the image URL)
+TARGETS = {
+    "photo": (Photo, "file_path"),
+    "news_post": (NewsPost, "image_path"),
+}
+
+
+def media_queue_enabled() -> bool:
+    cfg = current_app.config
+    return bool(
+        cfg.get("MEDIA_QUEUE_ENABLED")
+        and cfg.get("CLOUDINARY_CLOUD_NAME")
+        and cfg.get("CLOUDINARY_API_KEY")
+        and cfg.get("CLOUDINARY_API_SECRET")
+    )
+
+
+def cloudinary_variants(public_id: str, res: dict) -> dict:
+    """Cloudinary resizes on the fly: derivatives are just transformation URLs."""
+    if not public_id or not res.get("width") or not cloudinary.config().cloud_name:
+        return {}
+    return {
+        "thumb_path": cloudinary.CloudinaryImage(public_id).build_url(
+            width=THUMB_WIDTH, crop="limit", fetch_format="auto", quality="auto", secure=True),
+        "medium_path": cloudinary.CloudinaryImage(public_id).build_url(
+            width=MEDIUM_WIDTH, crop="limit", fetch_format="auto", quality="auto", secure=True),
+        "width": res.get("width"),
+        "height": res.get("height"),
+    }
+
+
+# ---------------- ENQUEUE (request side) ----------------
+def spool_upload(file_storage) -> str:
+    """Copy the upload to the spool folder, the worker sends it later."""
+    spool_folder = current_app.config["MEDIA_SPOOL_FOLDER"]
+    os.makedirs(spool_folder, exist_ok=True)
+    ext = os.path.splitext(file_storage.filename)[1].lower()
+    path = os.path.join(spool_folder, f"{uuid.uuid4().hex}{ext}")
+    file_storage.save(path)
+    return path
+
+
+def enqueue_upload(row, spool_path: str, subfolder: str):
+    """Queue the Cloudinary upload of row's image (row must be flushed)."""
+    target_type = row.__tablename__
+    _, url_attr = TARGETS[target_type]
+    setattr(row, url_attr, "")
+    row.upload_status = "pending"
+    db.session.add(MediaJob(
+        kind="upload",
+        target_type=target_type,
+        target_id=row.id,
+        subfolder=subfolder,
+        spool_path=spool_path,
+    ))
+
+
+def enqueue_delete(public_id: str):
+    db.session.add(MediaJob(kind="delete", public_id=public_id))
+
+
+# ---------------- WORKER ----------------
+def claim_next_job():
+    """Atomically mark one due job as running ; None when the queue is empty."""
+    jobs = claim_due(MediaJob, limit=1)
+    return jobs[0] if jobs else None
+
+
+def _run_upload(job, uploader):
+    model, url_attr = TARGETS[job.target_type]
+    row = db.session.get(model, job.target_id)
+    if row is None:
+        # Deleted while waiting: nothing to upload
+        return
+
+    folder = f"{current_app.config.get('CLOUDINARY_FOLDER', 'tily-cergy-fandresena')}/{job.subfolder}"
+    with timed_call("cloudinary"):
+        res = uploader.upload(job.spool_path, folder=folder, resource_type="image")
+    public_id = res.get("public_id") or ""
+
+    setattr(row, url_attr, res.get("secure_url") or res.get("url") or "")
+    row.cloudinary_public_id = public_id
+    for key, value in cloudinary_variants(public_id, res).items():
+        setattr(row, key, value)
+    row.upload_status = "ready"
+
+
+def _run_delete(job, uploader):
+    with timed_call("cloudinary"):
+        uploader.destroy(job.public_id, resource_type="image")
+
+
+def _remove_spool(job):
+    try:
+        if job.spool_path and os.path.exists(job.spool_path):
+            os.remove(job.spool_path)
+    except Exception:
+        current_app.logger.exception("Spool cleanup failed")
+
+
+def process_job(job, uploader):
+    """Run one claimed job ; failures are retried with exponential backoff."""
+    cfg = current_app.config
+    try:
+        if job.kind == "upload":
+            _run_upload(job, uploader)
+        else:
+            _run_delete(job, uploader)
+        job.status = "done"
+        job.last_error = ""
+        db.session.commit()
+        _remove_spool(job)
+        if job.kind == "upload" and job.target_type == "news_post":
+            news_changed()  # cached / frozen pages still show the post without its image
+        return True
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Media job %s failed (attempt %s)", job.id, job.attempts)
+
+        gave_up = schedule_retry(
+            job, e, cfg.get("MEDIA_JOB_MAX_ATTEMPTS", 5), cfg.get("MEDIA_JOB_BACKOFF", 30)
+        )
+        if gave_up and job.kind == "upload":
+            model, _ = TARGETS[job.target_type]
+            row = db.session.get(model, job.target_id)
+            if row is not None:
+                row.upload_status = "failed"
+        db.session.commit()
+        if gave_up and job.kind == "upload" and job.target_type == "news_post":
+            news_changed()
+        return False
+
+
+def run_pending(uploader=None, limit: int = 50) -> int:
+    """Process up to limit due jobs. Returns how many were claimed."""
+    uploader = uploader or cloudinary.uploader
+    count = 0
+    while count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        process_job(job, uploader)
+        count += 1
+    return count
+
+
+def run_worker(uploader=None, poll_interval: float = 5.0, stop_event=None):
+    """Poll the queue forever (or until stop_event is set)."""
+    poll_forever(lambda: run_pending(uploader), poll_interval, current_app.logger, stop_event)
+
+
+def start_worker_thread(app, uploader=None):
+    """In-process worker for single-instance deploys (no separate worker dyno)."""
+    return start_background_loop(
+        app, "media-worker", run_worker, uploader, app.config.get("MEDIA_WORKER_POLL", 5.0)
+    )
+
+
+class LocalFakeUploader:
+    """Stands in for cloudinary.uploader in tests / local dev: copies files to a folder.
+
+    fail_times makes the first N calls raise, to exercise retries.
+    """
+
+    def __init__(self, folder: str = "instance/fake_cloudinary", fail_times: int = 0):
+        self.folder = folder
+        self.fail_times = fail_times
+        self.calls = []
+
+    def _maybe_fail(self):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("fake uploader: simulated network error")
+
+    def upload(self, file, folder: str = "", resource_type: str = "image", **kwargs):
+        self.calls.append(("upload", file))
+        self._maybe_fail()
+        public_id = f"{folder}/{uuid.uuid4().hex}".strip("/")
+        dest = os.path.join(self.folder, public_id + os.path.splitext(file)[1])
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(file, dest)
+        with Image.open(dest) as img:
+            width, height = img.size
+        return {"public_id": public_id, "secure_url": "/" + dest.replace(os.sep, "/").lstrip("/"),
+                "width": width, "height": height}
+
+    def destroy(self, public_id: str, resource_type: str = "image", **kwargs):
+        self.calls.append(("destroy", public_id))
+        self._maybe_fail()
+        base = os.path.join(self.folder, public_id)
+        for ext in (".jpg", ".jpeg", ".png", ".webp"):
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
+        return {"result": "ok"}
@@ -0,0 +1,251 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import (
+    before_render_template, current_app, g, has_app_context, has_request_context, request, template_rendered,
+)
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds ; the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Queries kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 30
+
+HELP = {
+    "tily_request_duration_seconds": ("histogram", "Request latency by endpoint."),
+    "tily_sql_queries_total": ("counter", "SQL statements executed, by endpoint."),
+    "tily_sql_duration_seconds_total": ("counter", "Time spent in SQL, by endpoint."),
+    "tily_template_render_seconds": ("histogram", "Jinja render time by template."),
+    "tily_outbound_duration_seconds": ("histogram", "Calls to Cloudinary / Stripe / SMTP."),
+    "tily_slow_requests_total": ("counter", "Requests slower than SLOW_REQUEST_MS."),
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """In-process registry (one per gunicorn worker), rendered in Prometheus text format.
+
+    Every series carries a worker="<pid>" label: a scrape reaches one worker,
+    and counters of different workers must not look like resets.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name: str, labels: dict):
+        return (name, tuple(sorted({**labels, "worker": str(os.getpid())}.items())))
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            names = sorted({k[0] for k in self._histograms} | {k[0] for k in self._counters})
+            for name in names:
+                kind, text = HELP.get(name, ("untyped", ""))
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(dict(labels))} {value:g}")
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    labels = dict(labels)
+                    cumulative = 0
+                    for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def get_metrics():
+    return current_app.extensions.get("metrics") if has_app_context() else None
+
+
+def _timings():
+    """Per-request accumulator, None outside a request (worker threads)."""
+    if has_request_context():
+        return g.get("_timings")
+    return None
+
+
+# ---------------- SQL (engine events, every engine / bind) ----------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    timings = _timings()
+    if timings is None:
+        return
+    timings["sql_count"] += 1
+    timings["sql_time"] += elapsed
+    if len(timings["queries"]) < MAX_LOGGED_QUERIES:
+        timings["queries"].append((elapsed, " ".join(statement.split())[:300]))
+
+
+# ---------------- TEMPLATES (Flask signals) ----------------
+def _before_render(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None:
+        timings["render_starts"].append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    timings = _timings()
+    if timings is None or not timings["render_starts"]:
+        return
+    elapsed = time.perf_counter() - timings["render_starts"].pop()
+    timings["render_time"] += elapsed
+    metrics = sender.extensions.get("metrics")
+    if metrics is not None:
+        metrics.observe("tily_template_render_seconds", elapsed, template=template.name or "string")
+
+
+# ---------------- OUTBOUND CALLS ----------------
+@contextmanager
+def timed_call(service: str):
+    """Time a call to an external service (cloudinary, stripe, smtp).
+
+    Works in requests (Server-Timing + histogram) and in worker threads
+    (histogram only).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _timings()
+        if timings is not None:
+            timings["outbound"][service] = timings["outbound"].get(service, 0.0) + elapsed
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.observe("tily_outbound_duration_seconds", elapsed, service=service)
+
+
+# ---------------- REQUEST MIDDLEWARE ----------------
+def _server_timing(timings: dict, total: float) -> str:
+    parts = [
+        f'sql;dur={timings["sql_time"] * 1000:.1f};desc="{timings["sql_count"]} queries"',
+        f"tpl;dur={timings['render_time'] * 1000:.1f}",
+    ]
+    parts += [f"{name};dur={sec * 1000:.1f}" for name, sec in timings["outbound"].items()]
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def metrics_allowed() -> bool:
+    """Scraper with METRICS_TOKEN (Authorization: Bearer ...) or a logged-in admin."""
+    token = current_app.config.get("METRICS_TOKEN", "")
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    return current_user.is_authenticated and current_user.role == "ADMIN"
+
+
+def init_metrics(app):
+    """Request latency / SQL / template / outbound timings, Server-Timing header,
+    slow-request log and the /metrics endpoint."""
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def start_timings():
+        g._timings = {
+            "start": time.perf_counter(),
+            "sql_count": 0,
+            "sql_time": 0.0,
+            "queries": [],
+            "render_starts": [],
+            "render_time": 0.0,
+            "outbound": {},
+        }
+
+    @app.after_request
+    def record_timings(resp):
+        timings = g.pop("_timings", None)
+        if timings is None or request.endpoint == "static":
+            return resp
+        total = time.perf_counter() - timings["start"]
+        endpoint = request.endpoint or "unmatched"
+
+        metrics.observe("tily_request_duration_seconds", total,
+                        endpoint=endpoint, method=request.method, status=f"{resp.status_code // 100}xx")
+        metrics.inc("tily_sql_queries_total", timings["sql_count"], endpoint=endpoint)
+        metrics.inc("tily_sql_duration_seconds_total", timings["sql_time"], endpoint=endpoint)
+
+        if app.config.get("SERVER_TIMING_ENABLED", True):
+            resp.headers["Server-Timing"] = _server_timing(timings, total)
+
+        slow_ms = app.config.get("SLOW_REQUEST_MS", 500)
+        if slow_ms and total * 1000 >= slow_ms:
+            metrics.inc("tily_slow_requests_total", endpoint=endpoint)
+            queries = "\n".join(f"  {sec * 1000:7.1f} ms  {sql}" for sec, sql in timings["queries"])
+            app.logger.warning(
+                "Slow request %s %s (%s) %.0f ms: sql %d queries / %.0f ms, template %.0f ms, outbound %s\n%s",
+                request.method, request.full_path, endpoint, total * 1000,
+                timings["sql_count"], timings["sql_time"] * 1000, timings["render_time"] * 1000,
+                {k: round(v * 1000) for k, v in timings["outbound"].items()}, queries,
+            )
+        return resp
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        if not metrics_allowed():
+            return "", 403
+        return current_app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
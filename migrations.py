@@ -0,0 +1,171 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import db, User, NewsPost, Album, Photo, ContactMessage, MediaJob, EmailOutbox, SyncTombstone
+from search import search_ddl
+
+# Applied versions are recorded here ; each migration runs once per database.
+VERSION_TABLE = "schema_migrations"
+
+
+# ---------------- HELPERS (SQLite + PostgreSQL) ----------------
+def create_table(conn, model):
+    """CREATE TABLE (+ its indexes) from the model, skipped if it exists."""
+    model.__table__.create(conn, checkfirst=True)
+
+
+def add_column(conn, table: str, column: str, ddl: str):
+    # SQLite has no ADD COLUMN IF NOT EXISTS: look at the table first
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(conn, name: str, table: str, columns: str):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# ---------------- MIGRATIONS ----------------
+def m001_base_tables(conn):
+    for model in (User, NewsPost, Album, Photo, ContactMessage):
+        create_table(conn, model)
+
+
+def m002_news_event_link(conn):
+    add_column(conn, "news_post", "event_link", "VARCHAR(500) DEFAULT ''")
+
+
+def m003_listing_indexes(conn):
+    create_index(conn, "ix_news_post_created_at_id", "news_post", "created_at DESC, id")
+    create_index(conn, "ix_photo_album_approved_created", "photo", "album_id, approved, created_at")
+
+
+def m004_image_variants(conn):
+    for table in ("news_post", "photo"):
+        add_column(conn, table, "thumb_path", "VARCHAR(255) DEFAULT ''")
+        add_column(conn, table, "medium_path", "VARCHAR(255) DEFAULT ''")
+        add_column(conn, table, "width", "INTEGER")
+        add_column(conn, table, "height", "INTEGER")
+        add_column(conn, table, "upload_status", "VARCHAR(10) DEFAULT 'ready' NOT NULL")
+
+
+def m005_media_job(conn):
+    create_table(conn, MediaJob)
+
+
+def m006_image_path_indexes(conn):
+    create_index(conn, "ix_photo_file_path", "photo", "file_path")
+    create_index(conn, "ix_news_post_image_path", "news_post", "image_path")
+
+
+def m007_contact_is_read(conn):
+    add_column(conn, "contact_message", "is_read", "BOOLEAN DEFAULT FALSE NOT NULL")
+    create_index(conn, "ix_contact_message_read_created", "contact_message", "is_read, created_at DESC, id")
+
+
+def m008_email_outbox(conn):
+    create_table(conn, EmailOutbox)
+
+
+def m009_full_text_search(conn):
+    for statement in search_ddl(conn.dialect.name):
+        conn.execute(text(statement))
+
+
+def m010_sync_updated_at(conn):
+    for table in ("news_post", "album", "photo"):
+        add_column(conn, table, "updated_at", "TIMESTAMP")
+        conn.execute(text(
+            f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+        ))
+        create_index(conn, f"ix_{table}_updated_at_id", table, "updated_at, id")
+    create_table(conn, SyncTombstone)
+
+
+def m011_moderation_indexes(conn):
+    create_index(conn, "ix_photo_approved_created", "photo", "approved, created_at DESC, id")
+    create_index(conn, "ix_album_approved_created", "album", "approved, created_at DESC, id")
+
+
+def m012_pending_users_index(conn):
+    # NULL created_at rows could never be reached by the keyset cursor
+    conn.execute(text('UPDATE "user" SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+    create_index(conn, "ix_user_validated_created", '"user"', "role_validated, created_at DESC, id")
+
+
+# Append only: never renumber or edit a migration that already ran in production.
+MIGRATIONS = [
+    (1, "base tables", m001_base_tables),
+    (2, "news_post.event_link", m002_news_event_link),
+    (3, "listing indexes", m003_listing_indexes),
+    (4, "image variants", m004_image_variants),
+    (5, "media_job table", m005_media_job),
+    (6, "image path indexes", m006_image_path_indexes),
+    (7, "contact_message.is_read", m007_contact_is_read),
+    (8, "email_outbox table", m008_email_outbox),
+    (9, "full-text search", m009_full_text_search),
+    (10, "updated_at + sync tombstones", m010_sync_updated_at),
+    (11, "moderation queue indexes", m011_moderation_indexes),
+    (12, "pending users index", m012_pending_users_index),
+]
+
+
+# ---------------- RUNNER ----------------
+def _ensure_version_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def applied_versions(engine=None) -> set:
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {VERSION_TABLE}"))}
+
+
+def pending_migrations(engine=None) -> list:
+    done = applied_versions(engine)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def migrate(engine=None, logger=None) -> list:
+    """Apply pending migrations in order, one transaction each.
+
+    Returns the versions applied. A failure stops the run (and the release):
+    later migrations may depend on the one that failed.
+    """
+    engine = engine or db.engine
+    applied = []
+    for version, name, upgrade in pending_migrations(engine):
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:v, :n, :at)"),
+                {"v": version, "n": name, "at": datetime.utcnow()},
+            )
+        if logger:
+            logger.info("Migration %03d applied: %s", version, name)
+        applied.append(version)
+    return applied
+
+
+def seed_initial_admin(logger=None) -> bool:
+    """Create INIT_ADMIN_USER once (needs an app context). True if created."""
+    admin_user = os.getenv("INIT_ADMIN_USER")
+    admin_pass = os.getenv("INIT_ADMIN_PASS")
+    if not (admin_user and admin_pass):
+        return False
+    if User.query.filter_by(username=admin_user.lower()).first():
+        return False
+
+    u = User(username=admin_user.lower(), role="ADMIN", role_validated=True)
+    u.set_password(admin_pass)
+    db.session.add(u)
+    db.session.commit()
+    if logger:
+        logger.info("Initial admin created.")
+    return True
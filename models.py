@@ -3,7 +3,35 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Widths of the resized copies generated at upload time
+THUMB_WIDTH = 400
+MEDIUM_WIDTH = 1200
+
+
+class ImageVariantsMixin:
+    """Resized copies (WebP) of an uploaded image + size of the full image."""
+    thumb_path = db.Column(db.String(255), default="")
+    medium_path = db.Column(db.String(255), default="")
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    # ready / pending (queued for Cloudinary) / failed
+    upload_status = db.Column(db.String(10), default="ready", nullable=False)
+
+    def srcset(self, full_url: str) -> str:
+        if not self.width:
+            return ""
+        candidates = [(self.thumb_path, THUMB_WIDTH), (self.medium_path, MEDIUM_WIDTH)]
+        parts = [f"{path} {w}w" for path, w in candidates if path and w < self.width]
+        parts.append(f"{full_url} {self.width}w")
+        return ", ".join(parts)
+
+def role_is_staff(role: str, role_validated: bool) -> bool:
+    return (role in ("KP", "RESPONSABLE", "ADMIN")) and bool(role_validated)
+
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,7 +45,7 @@ class User(UserMixin, db.Model):
     role_requested = db.Column(db.String(20), default="", nullable=False)
     role_validated = db.Column(db.Boolean, default=False, nullable=False)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     def set_password(self, raw_password: str):
         self.password_hash = generate_password_hash(raw_password)
@@ -26,33 +54,85 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, raw_password)
 
     def is_staff(self) -> bool:
-        return (self.role in ("KP", "RESPONSABLE", "ADMIN")) and bool(self.role_validated)
+        return role_is_staff(self.role, self.role_validated)
 
-class NewsPost(db.Model):
+# Admin, role requests: WHERE role_validated = false ORDER BY created_at DESC, id
+db.Index("ix_user_validated_created", User.role_validated, User.created_at.desc(), User.id)
+
+class NewsPost(ImageVariantsMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(140), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    image_path = db.Column(db.String(255), default="")
+    image_path = db.Column(db.String(255), default="", index=True)
     cloudinary_public_id = db.Column(db.String(255), default="")
     event_link = db.Column(db.String(500), default="")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Keyset pagination of the news feed: ORDER BY created_at DESC, id
+db.Index("ix_news_post_created_at_id", NewsPost.created_at.desc(), NewsPost.id)
+# Delta sync (/api/v1/...?since=): WHERE updated_at > ? ORDER BY updated_at, id
+db.Index("ix_news_post_updated_at_id", NewsPost.updated_at, NewsPost.id)
 
 class Album(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(140), nullable=False)
     description = db.Column(db.Text, default="")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     approved = db.Column(db.Boolean, default=False, nullable=False)
 
-class Photo(db.Model):
+db.Index("ix_album_updated_at_id", Album.updated_at, Album.id)
+# Moderation queue: WHERE approved = false ORDER BY created_at DESC, id
+db.Index("ix_album_approved_created", Album.approved, Album.created_at.desc(), Album.id)
+
+class Photo(ImageVariantsMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     album_id = db.Column(db.Integer, db.ForeignKey("album.id"), nullable=False)
-    file_path = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(255), nullable=False, index=True)
     caption = db.Column(db.String(200), default="")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     approved = db.Column(db.Boolean, default=False, nullable=False)
     cloudinary_public_id = db.Column(db.String(255), default="")
 
+# Album page: WHERE album_id = ? [AND approved] ORDER BY created_at DESC
+db.Index("ix_photo_album_approved_created", Photo.album_id, Photo.approved, Photo.created_at)
+db.Index("ix_photo_updated_at_id", Photo.updated_at, Photo.id)
+# Moderation queue (all albums): WHERE approved = false ORDER BY created_at DESC, id
+db.Index("ix_photo_approved_created", Photo.approved, Photo.created_at.desc(), Photo.id)
+
+class SyncTombstone(db.Model):
+    """Deleted news / album / photo, reported by the delta sync API."""
+    __tablename__ = "sync_tombstone"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # news / album / photo
+    ref_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+db.Index("ix_sync_tombstone_kind_deleted", SyncTombstone.kind, SyncTombstone.deleted_at)
+
+TOMBSTONE_KINDS = {"news_post": "news", "album": "album", "photo": "photo"}
+
+
+def record_tombstones(connection, kind: str, ids):
+    """Write tombstones for deleted rows (bulk deletes call it directly)."""
+    ids = list(ids)
+    if ids:
+        now = datetime.utcnow()
+        connection.execute(
+            SyncTombstone.__table__.insert(),
+            [{"kind": kind, "ref_id": ref_id, "deleted_at": now} for ref_id in ids],
+        )
+
+
+def _tombstone_after_delete(mapper, connection, target):
+    record_tombstones(connection, TOMBSTONE_KINDS[target.__tablename__], [target.id])
+
+
+for _model in (NewsPost, Album, Photo):
+    db.event.listen(_model, "after_delete", _tombstone_after_delete)
+
 class ContactMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -60,3 +140,47 @@ class ContactMessage(db.Model):
     subject = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+
+# Admin inbox: unread messages first page, ORDER BY created_at DESC, id
+db.Index("ix_contact_message_read_created", ContactMessage.is_read, ContactMessage.created_at.desc(), ContactMessage.id)
+
+class MediaJob(db.Model):
+    """Cloudinary transfer run outside the request by the media worker."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # upload / delete
+    # pending / running / done / failed
+    status = db.Column(db.String(10), default="pending", nullable=False)
+    target_type = db.Column(db.String(20), default="")  # photo / news_post
+    target_id = db.Column(db.Integer)
+    subfolder = db.Column(db.String(40), default="")
+    spool_path = db.Column(db.String(255), default="")
+    public_id = db.Column(db.String(255), default="")
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, default="")
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+db.Index("ix_media_job_status_run_after", MediaJob.status, MediaJob.run_after)
+
+class EmailOutbox(db.Model):
+    """Email waiting to be sent by the mail sender (batched over one SMTP connection)."""
+    __tablename__ = "email_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    contact_message_id = db.Column(db.Integer, db.ForeignKey("contact_message.id", ondelete="SET NULL"))
+    contact_message = db.relationship("ContactMessage")
+    to_addr = db.Column(db.String(200), nullable=False)
+    reply_to = db.Column(db.String(200), default="")
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    # pending / running / sent / failed
+    status = db.Column(db.String(10), default="pending", nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, default="")
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+db.Index("ix_email_outbox_status_run_after", EmailOutbox.status, EmailOutbox.run_after)
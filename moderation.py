@@ -0,0 +1,116 @@
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, update
+
+from models import db, Album, Photo, record_tombstones
+from pagination import keyset_page
+
+# Cross-album moderation: pending rows from the (approved, created_at DESC, id)
+# indexes, approved / rejected by id list in one statement per table. Files of
+# rejected rows go to media_cleanup.delete_uploaded_images() in one batch.
+
+IMAGE_COLUMNS = (Photo.file_path, Photo.thumb_path, Photo.medium_path, Photo.cloudinary_public_id)
+
+
+def photo_images(rows) -> list:
+    """(url, public_id, variant_paths) of photos, for delete_uploaded_images()."""
+    return [
+        (row.file_path, row.cloudinary_public_id or "", (row.thumb_path, row.medium_path))
+        for row in rows
+    ]
+
+
+def parse_ids(values, limit: int) -> list:
+    """Checked ids of the form (duplicates and junk dropped), at most limit."""
+    ids = sorted({int(v) for v in values if str(v).isdigit()})
+    return ids[:limit]
+
+
+def pending_photos(cursor: str = "", per_page: int = 100):
+    """Pending photos of every album, newest first (keyset page).
+
+    Returns (photos, album_titles, next_cursor) ; album_titles maps album_id
+    to title for the page (one small extra query, not one per photo).
+    """
+    query = Photo.query.filter(Photo.approved.is_(False))
+    photos, next_cursor = keyset_page(query, Photo.created_at, Photo.id, cursor, per_page)
+    album_ids = {p.album_id for p in photos}
+    titles = {}
+    if album_ids:
+        titles = dict(db.session.execute(select(Album.id, Album.title).where(Album.id.in_(album_ids))).all())
+    return photos, titles, next_cursor
+
+
+def pending_albums(limit: int = 100) -> list:
+    """Pending albums, newest first, with their photo count (.Album, .photo_count)."""
+    # Correlated count: uses the album_id index for the few pending albums only
+    photo_count = (
+        select(func.count(Photo.id)).where(Photo.album_id == Album.id).scalar_subquery().label("photo_count")
+    )
+    return (
+        db.session.query(Album, photo_count)
+        .filter(Album.approved.is_(False))
+        .order_by(Album.created_at.desc(), Album.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def pending_counts() -> dict:
+    return {
+        "photos": db.session.query(func.count(Photo.id)).filter(Photo.approved.is_(False)).scalar(),
+        "albums": db.session.query(func.count(Album.id)).filter(Album.approved.is_(False)).scalar(),
+    }
+
+
+# ---------------- BULK ACTIONS (caller commits) ----------------
+def approve_photos(ids) -> int:
+    result = db.session.execute(
+        update(Photo)
+        .where(Photo.id.in_(ids), Photo.approved.is_(False))
+        .values(approved=True, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def approve_albums(ids) -> int:
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(Album)
+        .where(Album.id.in_(ids), Album.approved.is_(False))
+        .values(approved=True, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    # Their approved photos become visible: make the delta sync send them
+    db.session.execute(
+        update(Photo).where(Photo.album_id.in_(ids)).values(updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _delete_photos(where) -> list:
+    """DELETE the photos matching where ; returns their image columns for cleanup."""
+    rows = db.session.execute(select(Photo.id, *IMAGE_COLUMNS).where(where)).all()
+    if rows:
+        ids = [row.id for row in rows]
+        db.session.execute(delete(Photo).where(Photo.id.in_(ids)).execution_options(synchronize_session=False))
+        record_tombstones(db.session.connection(), "photo", ids)
+    return rows
+
+
+def reject_photos(ids) -> list:
+    """Delete pending photos ; returns their image columns (photo_images())."""
+    return _delete_photos(Photo.id.in_(ids) & Photo.approved.is_(False))
+
+
+def reject_albums(ids):
+    """Delete pending albums and all their photos. Returns (albums deleted, photo rows)."""
+    album_ids = db.session.scalars(select(Album.id).where(Album.id.in_(ids), Album.approved.is_(False))).all()
+    if not album_ids:
+        return 0, []
+    rows = _delete_photos(Photo.album_id.in_(album_ids))
+    db.session.execute(delete(Album).where(Album.id.in_(album_ids)).execution_options(synchronize_session=False))
+    record_tombstones(db.session.connection(), "album", album_ids)
+    return len(album_ids), rows
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, row_id) -> str:
+    """Cursor = last seen (created_at, id), e.g. '2026-03-01T10:00:00.123456_42'."""
+    if not created_at or row_id is None:
+        return ""
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: str):
+    """Returns (created_at, id) or None if the cursor is missing/invalid."""
+    if not cursor or "_" not in cursor:
+        return None
+    raw_date, raw_id = cursor.rsplit("_", 1)
+    if not raw_id.isdigit():
+        return None
+    try:
+        return (datetime.fromisoformat(raw_date), int(raw_id))
+    except ValueError:
+        return None
+
+
+def keyset_page(query, date_col, id_col, cursor: str = "", per_page: int = 12):
+    """Keyset pagination ordered by (date_col DESC, id_col ASC).
+
+    Matches the (created_at DESC, id) indexes, so a page costs the same
+    whatever its depth. Returns (items, next_cursor) ; next_cursor is ""
+    on the last page.
+    """
+    key = decode_cursor(cursor)
+    if key:
+        last_date, last_id = key
+        query = query.filter(
+            or_(date_col < last_date, and_(date_col == last_date, id_col > last_id))
+        )
+
+    rows = query.order_by(date_col.desc(), id_col.asc()).limit(per_page + 1).all()
+
+    next_cursor = ""
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_col.key), getattr(last, id_col.key))
+
+    return rows, next_cursor
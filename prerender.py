@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timezone
+from xml.sax.saxutils import escape
+
+from flask import current_app, request, send_file, session, url_for
+from flask_login import current_user
+
+from cache import invalidate_news_pages
+from service_worker import offline_paths
+
+# Pages written to static HTML, laid out like their URL (index.html,
+# scout-cergy/index.html...) so a CDN or nginx can serve them directly
+# (try_files $uri/index.html) ; the app serves them too, before any view.
+MANIFEST_NAME = "pages.json"
+# Set on the renderer's own requests: they must reach the view, not the frozen copy
+PRERENDER_ENVIRON = "tily.prerender"
+# Created (O_EXCL) by the worker rendering on a miss: the others keep serving live
+LOCK_NAME = ".rendering"
+LOCK_TTL = 300
+
+# Never crawled: member area, admin, forms, API
+ROBOTS_DISALLOW = (
+    "/admin", "/staff", "/espace", "/album", "/api/", "/changer-mot-de-passe",
+    "/login", "/logout", "/register", "/recherche", "/don/",
+)
+
+
+def _stamp(app) -> str:
+    """Deploy + asset fingerprints: frozen HTML from another deploy is never served."""
+    build_id, _ = app.extensions["build_stamp"]
+    assets = json.dumps(app.extensions.get("asset_manifest", {}), sort_keys=True)
+    return hashlib.sha256(f"{build_id}|{assets}".encode()).hexdigest()[:16]
+
+
+def _file_for(path: str) -> str:
+    return os.path.join(path.strip("/"), "index.html") if path.strip("/") else "index.html"
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)  # workers serving the page never read half a file
+
+
+class Prerenderer:
+    """Renders pages through the app itself, as an anonymous visitor.
+
+    pages: [(endpoint, url values)] ; news_endpoints: those listing NewsPost
+    rows, the only ones refreshed when news change.
+    """
+
+    def __init__(self, app, pages, news_endpoints=()):
+        self.app = app
+        self.pages = list(pages)
+        self.news_endpoints = set(news_endpoints)
+        self.folder = os.path.join(app.root_path, app.config.get("PRERENDER_FOLDER", "instance/prerendered"))
+        self.stamp = _stamp(app)
+        self._manifest = ({}, None)  # (manifest, mtime)
+        self._started = False
+
+    def urls(self, endpoints=None) -> list:
+        with self.app.test_request_context(base_url=self.app.config["BASE_URL"]):
+            return [
+                url_for(endpoint, **values) for endpoint, values in self.pages
+                if endpoints is None or endpoint in endpoints
+            ]
+
+    def render(self, endpoints=None) -> list:
+        """Write the pages (all, or those of endpoints) ; returns the paths written."""
+        app = self.app
+        written = []
+        # Own app context: the caller's g / session (a publishing request) stay untouched
+        with app.app_context():
+            client = app.test_client()
+            for path in self.urls(endpoints):
+                resp = client.get(path, base_url=app.config["BASE_URL"], environ_base={PRERENDER_ENVIRON: True})
+                if resp.status_code != 200:
+                    app.logger.warning("Prerender %s: HTTP %s, page skipped", path, resp.status_code)
+                    continue
+                _write_atomic(os.path.join(self.folder, _file_for(path)), resp.get_data())
+                written.append(path)
+            for name, body in (("sitemap.xml", self.sitemap()), ("robots.txt", self.robots())):
+                _write_atomic(os.path.join(self.folder, name), body.encode("utf-8"))
+
+        manifest = self.load_manifest() if endpoints is not None else {}
+        pages = dict(manifest.get("pages", {})) if manifest.get("stamp") == self.stamp else {}
+        pages.update({path: _file_for(path) for path in written})
+        manifest = {"stamp": self.stamp, "pages": pages}
+        _write_atomic(os.path.join(self.folder, MANIFEST_NAME), json.dumps(manifest, indent=1).encode("utf-8"))
+        return written
+
+    def refresh_news_pages(self):
+        """After a NewsPost is published or deleted (after commit)."""
+        if not self.load_manifest().get("pages"):
+            return []  # nothing frozen yet (freeze not run): nothing to refresh
+        return self.render(self.news_endpoints)
+
+    def render_in_background(self) -> bool:
+        """Freeze once, off the request, when this deploy has no frozen pages yet.
+
+        For hosts where `freeze` cannot run at build time (Heroku's release
+        phase has its own filesystem). One worker renders, guarded by a lock
+        file ; the wake-up request is answered by the live view meanwhile.
+        """
+        if self._started:
+            return False
+        self._started = True
+        lock = os.path.join(self.folder, LOCK_NAME)
+        os.makedirs(self.folder, exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(lock) > LOCK_TTL:
+                os.remove(lock)  # left by a worker killed mid-render
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+
+        def run():
+            try:
+                self.render()
+            except Exception:
+                self.app.logger.exception("Prerender on miss failed")
+            finally:
+                try:
+                    os.remove(lock)
+                except OSError:
+                    pass
+
+        threading.Thread(target=run, name="prerender", daemon=True).start()
+        return True
+
+    def load_manifest(self) -> dict:
+        """pages.json, re-read only when another worker rewrote it."""
+        path = os.path.join(self.folder, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        manifest, seen = self._manifest
+        if seen != mtime:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = {}
+            self._manifest = (manifest, mtime)
+        return manifest
+
+    # ---------------- SITEMAP / ROBOTS ----------------
+    def sitemap(self) -> str:
+        """Public pages of the route table (@offline_page) and the SEO pages."""
+        from models import db, NewsPost
+        from sqlalchemy import func
+
+        app = self.app
+        base = app.config["BASE_URL"].rstrip("/")
+        _, built_at = app.extensions["build_stamp"]
+        with app.app_context():
+            latest_news = db.session.query(func.max(NewsPost.created_at)).scalar()
+            news_paths = set(self.urls(self.news_endpoints)) | {"/actus"}
+        paths = sorted(set(offline_paths(app)) | set(self.urls()))
+
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for path in paths:
+            modified = built_at
+            if path in news_paths and latest_news:
+                modified = max(built_at, latest_news.replace(tzinfo=timezone.utc))
+            lines.append(
+                f"  <url><loc>{escape(base + path)}</loc><lastmod>{modified.date().isoformat()}</lastmod></url>"
+            )
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def robots(self) -> str:
+        base = self.app.config["BASE_URL"].rstrip("/")
+        lines = ["User-agent: *", "Allow: /"]
+        lines += [f"Disallow: {prefix}" for prefix in ROBOTS_DISALLOW]
+        lines += ["", f"Sitemap: {base}/sitemap.xml"]
+        return "\n".join(lines) + "\n"
+
+
+def get_prerenderer():
+    return current_app.extensions.get("prerender")
+
+
+def news_changed():
+    """After a NewsPost commit: drop the cached pages listing news, re-render the frozen ones."""
+    invalidate_news_pages()
+    prerenderer = get_prerenderer()
+    if prerenderer is not None:
+        prerenderer.refresh_news_pages()
+
+
+def init_prerender(app, pages, news_endpoints=()):
+    """Serve frozen pages to anonymous visitors, and /sitemap.xml + /robots.txt."""
+    prerenderer = Prerenderer(app, pages, news_endpoints)
+    app.extensions["prerender"] = prerenderer
+
+    @app.before_request
+    def serve_prerendered():
+        if request.method not in ("GET", "HEAD") or request.query_string or request.environ.get(PRERENDER_ENVIRON):
+            return None
+        manifest = prerenderer.load_manifest()
+        if manifest.get("stamp") != prerenderer.stamp:
+            if app.config.get("PRERENDER_ON_MISS", True):
+                prerenderer.render_in_background()
+            return None
+        name = manifest.get("pages", {}).get(request.path)
+        if not name:
+            return None
+        # Logged-in pages and pending flash messages differ from the frozen copy
+        if session.get("_flashes") or current_user.is_authenticated:
+            return None
+        path = os.path.join(prerenderer.folder, name)
+        if not os.path.isfile(path):
+            return None
+        resp = send_file(path, mimetype="text/html", conditional=True, etag=True, max_age=0)
+        resp.cache_control.no_cache = True
+        resp.vary.add("Cookie")
+        resp.headers["X-Prerendered"] = "1"
+        return resp
+
+    def _text(name: str, build, mimetype: str):
+        path = os.path.join(prerenderer.folder, name)
+        if os.path.isfile(path):
+            return send_file(path, mimetype=mimetype, conditional=True, max_age=3600)
+        resp = current_app.response_class(build(), mimetype=mimetype)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 3600
+        return resp
+
+    @app.get("/sitemap.xml")
+    def sitemap():
+        return _text("sitemap.xml", prerenderer.sitemap, "application/xml")
+
+    @app.get("/robots.txt")
+    def robots():
+        return _text("robots.txt", prerenderer.robots, "text/plain")
+
+    return prerenderer
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, request
+
+# Atomic token bucket for the shared backend (Redis-compatible EVAL)
+_BUCKET_LUA = """
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local cap = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local t = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+t = math.min(cap, t + math.max(0, now - ts) * rate)
+local ok = 0
+if t >= 1 then
+  t = t - 1
+  ok = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(t), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / rate) + 1)
+return {ok, tostring(t)}
+"""
+
+
+def _retry_after(tokens: float, rate: float) -> float:
+    return max(0.0, (1 - tokens) / rate)
+
+
+class MemoryBuckets:
+    """Token buckets of this worker ; the least recently used keys are dropped."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float):
+        """Take one token. Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return (allowed, 0.0 if allowed else _retry_after(tokens, rate))
+
+
+class SharedBuckets:
+    """Token buckets shared by every worker, on a Redis-compatible client (EVAL)."""
+
+    def __init__(self, client, namespace: str = "tily:rl:"):
+        self.client = client
+        self.namespace = namespace
+        self._script = client.register_script(_BUCKET_LUA)
+
+    def take(self, key: str, capacity: int, rate: float):
+        ok, tokens = self._script(keys=[self.namespace + key], args=[capacity, rate, time.time()])
+        allowed = int(ok) == 1
+        return (allowed, 0.0 if allowed else _retry_after(float(tokens), rate))
+
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+def init_rate_limiter(app, store=None):
+    """Attach the limiter to the app (RATE_LIMIT_ENABLED=false disables it)."""
+    if store is None and not app.config.get("RATE_LIMIT_ENABLED", True):
+        app.extensions["rate_limiter"] = None
+        return None
+
+    if store is None:
+        url = app.config.get("RATE_LIMIT_URL", "")
+        if url:
+            import redis  # optional dependency, only needed for the shared backend
+
+            store = SharedBuckets(redis.Redis.from_url(url))
+        else:
+            store = MemoryBuckets()
+
+    limiter = RateLimiter(store)
+    app.extensions["rate_limiter"] = limiter
+    return limiter
+
+
+def get_rate_limiter():
+    return current_app.extensions.get("rate_limiter")
+
+
+def check_auth_rate_limit(scope: str, username: str = ""):
+    """Take a token for the client IP, then for the username.
+
+    Call before any password hashing. Returns 0 when allowed, else the
+    number of seconds to wait. A *_PER_MINUTE rate of 0 (or less) turns
+    that check off.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return 0
+
+    cfg = current_app.config
+    ip_rate = cfg.get("AUTH_IP_PER_MINUTE", 10)
+    user_rate = cfg.get("AUTH_USER_PER_MINUTE", 5)
+    # remote_addr is the real client IP (ProxyFix applied in create_app)
+    ip = request.remote_addr or "unknown"
+    if ip_rate > 0:
+        allowed, retry = limiter.store.take(f"{scope}:ip:{ip}", cfg.get("AUTH_IP_BURST", 10), ip_rate / 60)
+        if not allowed:
+            limiter.count(f"{scope}.rejected_ip")
+            return max(1, round(retry))
+
+    if username and user_rate > 0:
+        allowed, retry = limiter.store.take(
+            f"{scope}:user:{username}", cfg.get("AUTH_USER_BURST", 5), user_rate / 60
+        )
+        if not allowed:
+            limiter.count(f"{scope}.rejected_username")
+            return max(1, round(retry))
+
+    limiter.count(f"{scope}.allowed")
+    return 0
@@ -0,0 +1,168 @@
+import re
+
+from flask import current_app
+from sqlalchemy import text
+
+from models import db, NewsPost, Album, Photo
+
+# Kinds of indexed rows. On SQLite they share one FTS5 table whose rowid is
+# id * ROWID_STRIDE + kind, so a trigger finds its row without a scan.
+KIND_NEWS = 1
+KIND_ALBUM = 2
+KIND_PHOTO = 3
+ROWID_STRIDE = 4
+
+# kind -> (table, title column, body column or None)
+SOURCES = {
+    KIND_NEWS: ("news_post", "title", "content"),
+    KIND_ALBUM: ("album", "title", "description"),
+    KIND_PHOTO: ("photo", "caption", None),
+}
+
+MODELS = {KIND_NEWS: NewsPost, KIND_ALBUM: Album, KIND_PHOTO: Photo}
+KIND_NAMES = {KIND_NEWS: "news", KIND_ALBUM: "album", KIND_PHOTO: "photo"}
+
+MAX_TERMS = 8
+
+
+# ---------------- SCHEMA (used by migrations.py) ----------------
+def _pg_vector(title: str, body):
+    vector = f"setweight(to_tsvector('french', coalesce({title}, '')), 'A')"
+    if body:
+        vector += f" || setweight(to_tsvector('french', coalesce({body}, '')), 'B')"
+    return vector
+
+
+def _sqlite_row(kind: int, title: str, body, ref: str):
+    return f"{ref}.id * {ROWID_STRIDE} + {kind}, {ref}.{title}, " + (f"{ref}.{body}" if body else "''")
+
+
+def search_ddl(dialect: str) -> list:
+    """Statements creating the search index, synced by the database itself.
+
+    PostgreSQL: a generated tsvector column + GIN index per table.
+    SQLite: one FTS5 table fed by insert / update / delete triggers.
+    """
+    statements = []
+    if dialect == "postgresql":
+        for table, title, body in SOURCES.values():
+            statements += [
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ({_pg_vector(title, body)}) STORED",
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)",
+            ]
+        return statements
+
+    if dialect != "sqlite":
+        raise RuntimeError(f"Full-text search not available on {dialect}")
+
+    statements.append(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    for kind, (table, title, body) in SOURCES.items():
+        insert = f"INSERT INTO search_fts (rowid, title, body) VALUES ({_sqlite_row(kind, title, body, 'new')});"
+        delete = f"DELETE FROM search_fts WHERE rowid = old.id * {ROWID_STRIDE} + {kind};"
+        columns = ", ".join(c for c in (title, body) if c)
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF {columns} ON {table} "
+            f"BEGIN {delete} {insert} END",
+            # Existing rows
+            f"INSERT INTO search_fts (rowid, title, body) SELECT {_sqlite_row(kind, title, body, table)} "
+            f"FROM {table} WHERE {table}.id * {ROWID_STRIDE} + {kind} NOT IN (SELECT rowid FROM search_fts)",
+        ]
+    return statements
+
+
+# ---------------- QUERIES ----------------
+def fts5_query(q: str) -> str:
+    """User input -> FTS5 expression: every word, as a prefix ("camp"* "ete"*)."""
+    terms = re.findall(r"\w+", q)[:MAX_TERMS]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def _pg_hits_sql(members: bool, moderator: bool) -> str:
+    branches = [
+        "SELECT 1 AS kind, n.id, ts_rank(n.search_vector, q.query) AS score, n.created_at "
+        "FROM news_post n, q WHERE n.search_vector @@ q.query"
+    ]
+    if members:
+        album_filter = "" if moderator else " AND a.approved"
+        photo_filter = "" if moderator else " AND p.approved AND pa.approved"
+        branches += [
+            "SELECT 2, a.id, ts_rank(a.search_vector, q.query), a.created_at "
+            f"FROM album a, q WHERE a.search_vector @@ q.query{album_filter}",
+            "SELECT 3, p.id, ts_rank(p.search_vector, q.query), p.created_at "
+            "FROM photo p JOIN album pa ON pa.id = p.album_id, q "
+            f"WHERE p.search_vector @@ q.query{photo_filter}",
+        ]
+    return (
+        "WITH q AS (SELECT websearch_to_tsquery('french', :q) AS query) "
+        f"SELECT kind, id FROM ({' UNION ALL '.join(branches)}) hits "
+        "ORDER BY score DESC, created_at DESC, kind, id LIMIT :limit OFFSET :offset"
+    )
+
+
+def _sqlite_hits_sql(members: bool, moderator: bool) -> str:
+    kind = f"(search_fts.rowid % {ROWID_STRIDE})"
+    if not members:
+        visible = f"{kind} = {KIND_NEWS}"
+    elif moderator:
+        visible = "1"
+    else:
+        visible = (
+            f"({kind} = {KIND_NEWS} OR ({kind} = {KIND_ALBUM} AND a.approved)"
+            f" OR ({kind} = {KIND_PHOTO} AND p.approved AND pa.approved))"
+        )
+    ref_id = f"(search_fts.rowid / {ROWID_STRIDE})"
+    return (
+        f"SELECT {kind} AS kind, {ref_id} AS id FROM search_fts "
+        f"LEFT JOIN album a ON {kind} = {KIND_ALBUM} AND a.id = {ref_id} "
+        f"LEFT JOIN photo p ON {kind} = {KIND_PHOTO} AND p.id = {ref_id} "
+        "LEFT JOIN album pa ON pa.id = p.album_id "
+        f"WHERE search_fts MATCH :q AND {visible} "
+        # bm25: lower is better ; titles weigh 4x the body
+        "ORDER BY bm25(search_fts, 4.0, 1.0), search_fts.rowid DESC LIMIT :limit OFFSET :offset"
+    )
+
+
+def search(q: str, page: int = 1, members: bool = False, moderator: bool = False):
+    """Ranked hits visible to the caller. Returns (hits, has_next).
+
+    Anonymous visitors only get news ; members also get approved albums and
+    photos ; moderators (staff / admin) get everything. Each hit is a dict
+    {"kind": "news" | "album" | "photo", "row": model instance}, best first.
+    """
+    q = (q or "").strip()
+    per_page = current_app.config.get("SEARCH_PER_PAGE", 20)
+    max_pages = current_app.config.get("SEARCH_MAX_PAGES", 20)
+    page = max(1, min(page, max_pages))
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        sql, match = _pg_hits_sql(members, moderator), q
+    else:
+        sql, match = _sqlite_hits_sql(members, moderator), fts5_query(q)
+    if not match:
+        return [], False
+
+    keys = db.session.execute(
+        text(sql), {"q": match, "limit": per_page + 1, "offset": (page - 1) * per_page}
+    ).all()
+    has_next = len(keys) > per_page and page < max_pages
+    keys = [(int(kind), int(ref_id)) for kind, ref_id in keys[:per_page]]
+
+    # One query per kind to load the rows, then back to rank order
+    rows = {}
+    for kind, model in MODELS.items():
+        ids = [ref_id for k, ref_id in keys if k == kind]
+        if ids:
+            rows.update({(kind, r.id): r for r in model.query.filter(model.id.in_(ids))})
+
+    hits = [
+        {"kind": KIND_NAMES[kind], "row": rows[(kind, ref_id)]}
+        for kind, ref_id in keys if (kind, ref_id) in rows
+    ]
+    return hits, has_next
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+from flask import current_app, render_template, request, url_for
+from flask_login import current_user
+
+from assets import DIST_DIR
+
+
+def offline_page(view):
+    """Mark a public GET page: precached (no URL argument) and cacheable by the SW.
+
+    Only for pages that look the same for every visitor ; the attribute
+    survives the other decorators through functools.wraps.
+    """
+    view.offline_page = True
+    return view
+
+
+def offline_paths(app) -> list:
+    """Paths of the @offline_page views without URL arguments, from the route table."""
+    paths = set()
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions.get(rule.endpoint)
+        if getattr(view, "offline_page", False) and "GET" in rule.methods and not rule.arguments:
+            paths.add(rule.rule)
+    return sorted(paths)
+
+
+def precache_assets(app) -> list:
+    """Fingerprinted CSS / JS, and images small enough to download up front."""
+    max_bytes = app.config.get("SW_PRECACHE_MAX_KB", 150) * 1024
+    urls = []
+    for hashed in app.extensions.get("asset_manifest", {}).get("files", {}).values():
+        path = os.path.join(app.static_folder, hashed)
+        if hashed.startswith(f"{DIST_DIR}/img/") and os.path.getsize(path) > max_bytes:
+            continue
+        urls.append(f"{app.static_url_path}/{hashed}")
+    return sorted(urls)
+
+
+def build_sw_config(app, extra_paths=()) -> dict:
+    """Everything sw.js needs ; the version changes with any of it (or the deploy).
+
+    extra_paths: public pages behind a URL argument (SEO pages), cached at
+    runtime but not precached.
+    """
+    build_id, _ = app.extensions["build_stamp"]
+    pages = offline_paths(app)
+    config = {
+        "precache": pages + precache_assets(app),
+        "pages": sorted(set(pages) | set(extra_paths)),
+        "imagePrefixes": [f"{app.static_url_path}/{DIST_DIR}/img/"],
+        # Resized upload variants only: full-resolution photos are never kept
+        "imageSuffixes": [".thumb.webp", ".medium.webp"],
+        "maxPages": app.config.get("SW_MAX_PAGES", 30),
+        "maxImages": app.config.get("SW_MAX_IMAGES", 80),
+        # Public news kept offline in IndexedDB through the delta API
+        "newsApi": url_for("api.news"),
+    }
+    digest = hashlib.sha256(f"{build_id}|{json.dumps(config, sort_keys=True)}".encode()).hexdigest()
+    config["version"] = digest[:12]
+    return config
+
+
+def init_service_worker(app, extra_paths=()):
+    """Serve the generated worker at /sw.js (root scope) and flag private responses."""
+
+    @app.get("/sw.js")
+    def service_worker():
+        config = app.extensions.get("sw_config")
+        if config is None:
+            config = app.extensions["sw_config"] = build_sw_config(app, extra_paths)
+        resp = current_app.response_class(
+            render_template("sw.js", sw_config=config), mimetype="application/javascript"
+        )
+        resp.cache_control.no_cache = True  # browsers must check for a new worker
+        return resp
+
+    @app.after_request
+    def private_when_logged_in(resp):
+        # The worker never stores private responses: logged-in pages stay off the device
+        if request.endpoint != "static" and current_user.is_authenticated:
+            resp.cache_control.private = True
+        return resp
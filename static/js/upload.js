@@ -0,0 +1,135 @@
+// Envoi des images par morceaux, reprenable après une coupure réseau (voir uploads.py).
+// Formulaires à un seul fichier : data-chunked-upload="<url de création>" et data-upload-target :
+//  - "album" (+ data-album-id) : le fichier devient une photo de l'album ;
+//  - "news" : l'image part d'abord, le formulaire ensuite avec upload_id.
+// L'ajout groupé garde son envoi classique : album_batch_upload traite tout le
+// lot en parallèle et en une seule transaction.
+// Sans fetch / Blob.slice, le formulaire part normalement (envoi classique).
+(function () {
+  const RETRIES = 6;
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  function storageKey(file, fields) {
+    return `upload:${JSON.stringify(fields)}:${file.name}:${file.size}:${file.lastModified}`;
+  }
+
+  async function call(url, options) {
+    const res = await fetch(url, { credentials: "same-origin", ...options });
+    let data = {};
+    try {
+      data = await res.json();
+    } catch (e) {
+      // HEAD / 204 : pas de corps
+    }
+    return { res, data };
+  }
+
+  // Où reprendre un envoi commencé (null : inconnu ou expiré)
+  async function serverOffset(url) {
+    const res = await fetch(url, { method: "HEAD", credentials: "same-origin" });
+    return res.ok ? parseInt(res.headers.get("Upload-Offset") || "0", 10) : null;
+  }
+
+  async function send(createUrl, file, fields, progress) {
+    const key = storageKey(file, fields);
+    let session = JSON.parse(localStorage.getItem(key) || "null");
+    let offset = session ? await serverOffset(session.url).catch(() => null) : null;
+
+    if (offset === null) {
+      const { res, data } = await call(createUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ filename: file.name, size: file.size, ...fields }),
+      });
+      if (!res.ok) throw new Error(data.error || "Envoi refusé.");
+      session = { url: data.url, chunk: data.chunk_size };
+      localStorage.setItem(key, JSON.stringify(session));
+      offset = 0;
+    }
+
+    for (let failures = 0; ;) {
+      const end = Math.min(offset + session.chunk, file.size);
+      let result;
+      try {
+        result = await call(session.url, {
+          method: "PATCH",
+          headers: { "Upload-Offset": String(offset), "Content-Type": "application/offset+octet-stream" },
+          body: file.slice(offset, end),
+        });
+      } catch (e) {
+        // Réseau coupé : attendre, demander au serveur où on en est, reprendre
+        if (++failures > RETRIES) throw new Error("Connexion perdue, réessayer plus tard.");
+        await sleep(1000 * 2 ** failures);
+        const at = await serverOffset(session.url).catch(() => null);
+        if (at !== null) offset = at;
+        continue;
+      }
+
+      const { res, data } = result;
+      if (res.status === 409 && typeof data.offset === "number") {
+        offset = data.offset;
+        continue;
+      }
+      if (res.status === 423) {
+        // Un envoi précédent du même morceau est encore en cours côté serveur
+        await sleep(1000);
+        const at = await serverOffset(session.url).catch(() => null);
+        if (at !== null) offset = at;
+        continue;
+      }
+      if (!res.ok) {
+        localStorage.removeItem(key);
+        throw new Error(data.error || "Envoi refusé.");
+      }
+      failures = 0;
+      offset = data.offset;
+      progress(offset / file.size);
+      if (data.done) {
+        localStorage.removeItem(key);
+        return data;
+      }
+    }
+  }
+
+  document.querySelectorAll("form[data-chunked-upload]").forEach((form) => {
+    const input = form.querySelector('input[type="file"]');
+    const status = form.querySelector("[data-upload-status]");
+    const button = form.querySelector('button[type="submit"]');
+
+    form.addEventListener("submit", async (event) => {
+      const file = input.files && input.files[0];
+      if (!file || !window.fetch || !Blob.prototype.slice) return;
+      event.preventDefault();
+      button.disabled = true;
+
+      const target = form.dataset.uploadTarget;
+      const fields = target === "album"
+        ? {
+          target,
+          album_id: form.dataset.albumId,
+          caption: form.elements.caption ? form.elements.caption.value : "",
+          consent: form.elements.consent && form.elements.consent.checked ? "yes" : "",
+        }
+        : { target };
+
+      let data;
+      try {
+        data = await send(form.dataset.chunkedUpload, file, fields, (ratio) => {
+          status.textContent = `${file.name} : ${Math.round(ratio * 100)} %`;
+        });
+      } catch (e) {
+        status.textContent = `${file.name} : ${e.message}`;
+        button.disabled = false;
+        return;
+      }
+
+      if (target === "news") {
+        form.elements.upload_id.value = data.upload_id;
+        input.disabled = true; // l'image est déjà sur le serveur
+        form.submit();
+        return;
+      }
+      window.location.reload();
+    });
+  });
+})();
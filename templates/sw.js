@@ -0,0 +1,157 @@
+// Généré par Flask (service_worker.py) : ne pas modifier à la main.
+const CONFIG = {{ sw_config|tojson }};
+
+const PRECACHE = `tily-precache-${CONFIG.version}`;
+const PAGES = `tily-pages-${CONFIG.version}`;
+// Images hashées / miniatures : même URL = même contenu, gardées entre versions
+const IMAGES = "tily-images";
+const CURRENT = [PRECACHE, PAGES, IMAGES];
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(
+    caches.open(PRECACHE)
+      // Sans cookies : jamais une version connectée des pages publiques
+      .then((cache) => cache.addAll(CONFIG.precache.map((url) => new Request(url, { credentials: "omit" }))))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((k) => !CURRENT.includes(k)).map((k) => caches.delete(k))))
+      .then(() => self.clients.claim())
+      .then(() => syncNews().catch(() => null))
+  );
+});
+
+// ---------------- Actus hors ligne (IndexedDB) ----------------
+// Seules les actus (publiques) sont synchronisées : rien de l'espace membres
+// n'est gardé sur l'appareil. Chaque sync ne télécharge que le diff (?since=).
+function idb(mode, fn) {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open("tily", 1);
+    open.onupgradeneeded = () => {
+      open.result.createObjectStore("news", { keyPath: "id" });
+      open.result.createObjectStore("meta");
+    };
+    open.onerror = () => reject(open.error);
+    open.onsuccess = () => {
+      const tx = open.result.transaction(["news", "meta"], mode);
+      const result = fn(tx);
+      tx.oncomplete = () => {
+        open.result.close();
+        resolve(result && result.result);
+      };
+      tx.onerror = () => reject(tx.error);
+    };
+  });
+}
+
+async function syncNews() {
+  let since = await idb("readonly", (tx) => tx.objectStore("meta").get("news_since"));
+  for (let more = true; more;) {
+    const url = `${CONFIG.newsApi}?since=${encodeURIComponent(since || "1970-01-01T00:00:00")}`;
+    const res = await fetch(url, { credentials: "omit" });
+    if (!res.ok) return;
+    const data = await res.json();
+    await idb("readwrite", (tx) => {
+      const news = tx.objectStore("news");
+      data.items.forEach((item) => news.put(item));
+      data.deleted.forEach((id) => news.delete(id));
+      tx.objectStore("meta").put(data.since, "news_since");
+    });
+    since = data.since;
+    more = data.more;
+  }
+}
+
+self.addEventListener("message", (event) => {
+  if (event.data === "sync-news") event.waitUntil(syncNews().catch(() => null));
+});
+
+self.addEventListener("periodicsync", (event) => {
+  if (event.tag === "news") event.waitUntil(syncNews().catch(() => null));
+});
+
+// Cache Storage garde l'ordre d'insertion : les premières clés sont les moins récentes
+async function trim(cacheName, maxEntries) {
+  const cache = await caches.open(cacheName);
+  const keys = await cache.keys();
+  for (let i = 0; i < keys.length - maxEntries; i++) {
+    await cache.delete(keys[i]);
+  }
+}
+
+async function store(cacheName, maxEntries, req, res) {
+  const cache = await caches.open(cacheName);
+  await cache.delete(req);
+  await cache.put(req, res);
+  await trim(cacheName, maxEntries);
+}
+
+function storable(res) {
+  const cc = res.headers.get("Cache-Control") || "";
+  return res.ok && res.type === "basic" && !/private|no-store/.test(cc);
+}
+
+function isImage(url) {
+  return CONFIG.imagePrefixes.some((p) => url.pathname.startsWith(p)) ||
+    CONFIG.imageSuffixes.some((s) => url.pathname.endsWith(s));
+}
+
+self.addEventListener("fetch", (event) => {
+  const req = event.request;
+  const url = new URL(req.url);
+
+  // On ne gère que les GET du même domaine
+  if (req.method !== "GET" || url.origin !== self.location.origin) return;
+
+  // Pages : réseau d'abord (304 bon marché grâce aux ETag), cache hors ligne.
+  // Seules les pages publiques, non privées (pas connecté), sont gardées.
+  if (req.mode === "navigate") {
+    const isPublic = CONFIG.pages.includes(url.pathname);
+    event.respondWith(
+      fetch(req)
+        .then((res) => {
+          if (isPublic && storable(res)) {
+            event.waitUntil(store(PAGES, CONFIG.maxPages, req, res.clone()));
+          }
+          return res;
+        })
+        .catch(() =>
+          caches.match(req, { ignoreVary: true })
+            .then((r) => r || caches.match("/", { ignoreVary: true }))
+        )
+    );
+    return;
+  }
+
+  // Fichiers précachés (noms hashés) : cache d'abord
+  if (CONFIG.precache.includes(url.pathname)) {
+    event.respondWith(
+      caches.open(PRECACHE).then((cache) => cache.match(req, { ignoreVary: true }))
+        .then((cached) => cached || fetch(req))
+    );
+    return;
+  }
+
+  // Images : cache d'abord, nombre limité, la moins récemment vue est retirée
+  if (isImage(url)) {
+    event.respondWith(
+      caches.open(IMAGES).then((cache) => cache.match(req)).then((cached) => {
+        if (cached) {
+          event.waitUntil(store(IMAGES, CONFIG.maxImages, req, cached.clone()));
+          return cached;
+        }
+        return fetch(req).then((res) => {
+          if (storable(res)) {
+            event.waitUntil(store(IMAGES, CONFIG.maxImages, req, res.clone()));
+          }
+          return res;
+        });
+      })
+    );
+  }
+  // Le reste (photos pleine taille, admin, API...) : réseau, sans cache
+});
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Config reads the environment when it is imported: set it before `import app`.
+# Two SQLite files stand for the primary database and its read replica.
+TMP = tempfile.mkdtemp(prefix="tily-tests-")
+PRIMARY_DB = os.path.join(TMP, "primary.db")
+REPLICA_DB = os.path.join(TMP, "replica.db")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{PRIMARY_DB}",
+    DATABASE_READ_URL=f"sqlite:///{REPLICA_DB}",
+    AUTO_CREATE_DB="false",
+    SECRET_KEY="test",
+    RATE_LIMIT_ENABLED="false",
+    RESPONSE_CACHE_TTL="0",
+    USER_CACHE_TTL="0",
+    PRERENDER_ON_MISS="false",
+    PRERENDER_FOLDER=os.path.join(TMP, "prerendered"),
+    UPLOAD_FOLDER=os.path.join(TMP, "uploads"),
+    UPLOAD_SESSION_FOLDER=os.path.join(TMP, "upload_sessions"),
+    MEDIA_SPOOL_FOLDER=os.path.join(TMP, "spool"),
+    MEDIA_WORKER_IN_PROCESS="false",
+    MAIL_SENDER_IN_PROCESS="false",
+    CLOUDINARY_CLOUD_NAME="",
+    SMTP_HOST="",
+    SERVER_TIMING_ENABLED="false",
+)
+
+from app import app as flask_app  # noqa: E402
+from migrations import migrate  # noqa: E402
+from models import db, User  # noqa: E402
+
+PASSWORD = "test-pass"
+
+
+@pytest.fixture(scope="session")
+def app():
+    with flask_app.app_context():
+        migrate()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # The replica starts as a copy of the migrated primary
+    shutil.copyfile(PRIMARY_DB, REPLICA_DB)
+    yield flask_app
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def app_ctx(app):
+    """Each test in an app context, both databases emptied afterwards."""
+    with app.app_context():
+        yield
+        db.session.rollback()
+        for engine in db.engines.values():
+            with engine.begin() as conn:
+                for table in reversed(db.metadata.sorted_tables):
+                    conn.execute(table.delete())
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username: str, role: str = "JEUNE", validated: bool = True) -> User:
+    user = User(username=username, role=role, role_validated=validated)
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def login(client, username: str, keep_primary_pin: bool = False):
+    resp = client.post("/login", data={"username": username, "password": PASSWORD})
+    assert resp.status_code == 302
+    if not keep_primary_pin:
+        # Logging in is a POST: it pins reads to the primary (see database.py)
+        with client.session_transaction() as session:
+            session.pop("db_primary_until", None)
+    return resp
+
+
+@pytest.fixture
+def staff(client):
+    make_user("kp", role="KP")
+    login(client, "kp")
+    return client
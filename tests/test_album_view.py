@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import login, make_user
+from models import db, Album, Photo
+
+
+@pytest.fixture
+def album():
+    album = Album(title="Camp", approved=True)
+    db.session.add(album)
+    db.session.flush()
+    db.session.add_all([
+        Photo(album_id=album.id, file_path="/static/ready.jpg", approved=True),
+        Photo(album_id=album.id, file_path="", approved=True, upload_status="pending"),
+        Photo(album_id=album.id, file_path="", approved=True, upload_status="failed"),
+        Photo(album_id=album.id, file_path="/static/waiting.jpg", approved=False),
+    ])
+    db.session.commit()
+    return album
+
+
+def test_members_only_see_approved_photos_that_have_landed(client, album):
+    make_user("member")
+    login(client, "member")
+
+    html = client.get(f"/album/{album.id}").get_data(as_text=True)
+    assert "/static/ready.jpg" in html
+    assert "/static/waiting.jpg" not in html
+    assert "Envoi en cours" not in html and "Envoi échoué" not in html
+
+
+def test_staff_see_every_photo_of_the_album(staff, album):
+    html = staff.get(f"/album/{album.id}").get_data(as_text=True)
+    assert "/static/waiting.jpg" in html
+    assert "Envoi en cours" in html and "Envoi échoué" in html
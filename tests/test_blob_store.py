@@ -0,0 +1,65 @@
+import io
+import os
+import shutil
+import time
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app import save_uploaded_image
+from images import BLOB_FRESH_SECONDS
+from media_cleanup import delete_uploaded_images
+
+
+@pytest.fixture
+def local_store(app, monkeypatch):
+    """Local uploads under static/, where delete_uploaded_images() looks for them."""
+    monkeypatch.chdir(app.root_path)
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", "static/uploads_tests")
+    yield
+    shutil.rmtree(os.path.join(app.root_path, "static", "uploads_tests"), ignore_errors=True)
+
+
+def _upload():
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 600), "orange").save(buf, "PNG")
+    buf.seek(0)
+    url, _, variants = save_uploaded_image(FileStorage(buf, filename="camp.png"))
+    return url, variants
+
+
+def _age(url: str, variants: dict):
+    aged = time.time() - BLOB_FRESH_SECONDS - 1
+    for u in (url, variants["thumb_path"], variants["medium_path"]):
+        os.utime(u.lstrip("/"), (aged, aged))
+
+
+def _exists(url: str) -> bool:
+    return os.path.exists(url.lstrip("/"))
+
+
+def test_same_bytes_share_one_blob(local_store):
+    first, second = _upload(), _upload()
+    assert first == second
+    assert _exists(first[0]) and first[1]["width"] == 800
+
+
+def test_delete_keeps_a_blob_an_upload_just_reused(local_store):
+    url, variants = _upload()
+    _age(url, variants)
+    # A second upload of the same bytes reuses the blob, its row not committed yet;
+    # meanwhile the last committed row using it is deleted
+    assert _upload()[0] == url
+    assert delete_uploaded_images([(url, "", (variants["thumb_path"], variants["medium_path"]))]) == 0
+    assert _exists(url)
+
+
+def test_delete_removes_an_unused_blob_and_a_new_upload_writes_it_again(local_store):
+    url, variants = _upload()
+    _age(url, variants)
+    assert delete_uploaded_images([(url, "", (variants["thumb_path"], variants["medium_path"]))]) == 3
+    assert not _exists(url)
+
+    assert _upload()[0] == url
+    assert _exists(url) and _exists(variants["thumb_path"])
@@ -0,0 +1,49 @@
+import pytest
+
+from models import db, NewsPost
+
+
+@pytest.fixture(autouse=True)
+def replica_caught_up(monkeypatch):
+    """Public pages read the replica: let it see the primary's writes at once."""
+    monkeypatch.setitem(db.engines, "read", db.engines[None])
+
+
+def _etag(client, url: str = "/actus") -> str:
+    resp = client.get(url)
+    assert resp.status_code == 200
+    return resp.headers["ETag"]
+
+
+def test_unchanged_news_gets_304(client):
+    db.session.add(NewsPost(title="Camp", content="c"))
+    db.session.commit()
+    etag = _etag(client)
+
+    assert client.get("/actus", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_editing_a_post_changes_the_etag(client):
+    post = NewsPost(title="Camp", content="c", upload_status="pending")
+    db.session.add(post)
+    db.session.commit()
+    etag = _etag(client)
+
+    # What the media queue does when the image lands
+    post.image_path = "/static/uploads/camp.webp"
+    post.upload_status = "ready"
+    db.session.commit()
+
+    assert client.get("/actus", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_deleting_a_post_changes_the_etag(client):
+    posts = [NewsPost(title=f"Actu {i}", content="c") for i in range(2)]
+    db.session.add_all(posts)
+    db.session.commit()
+    etag = _etag(client)
+
+    db.session.delete(posts[0])
+    db.session.commit()
+
+    assert client.get("/actus", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,99 @@
+import smtplib
+from datetime import datetime, timedelta
+
+from job_queue import STALE_LOCK, claim_due
+from mail_outbox import send_pending
+from models import db, EmailOutbox
+
+
+def _mail(**kwargs) -> EmailOutbox:
+    mail = EmailOutbox(to_addr="kp@example.org", subject="s", body="b", **kwargs)
+    db.session.add(mail)
+    db.session.commit()
+    return mail
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP: records messages, can fail on the Nth send."""
+
+    def __init__(self, fail_at=None, error=None):
+        self.sent = []
+        self.fail_at = fail_at
+        self.error = error or smtplib.SMTPRecipientsRefused({})
+
+    def send_message(self, msg):
+        if self.fail_at is not None and len(self.sent) == self.fail_at:
+            self.fail_at = None
+            raise self.error
+        self.sent.append(msg)
+
+    def quit(self):
+        pass
+
+
+# ---------------- CLAIM ----------------
+def test_claim_takes_each_due_row_once():
+    first, second = _mail(), _mail()
+    _mail(run_after=datetime.utcnow() + timedelta(hours=1))  # not due yet
+
+    claimed = claim_due(EmailOutbox, limit=1) + claim_due(EmailOutbox, limit=1)
+    assert [m.id for m in claimed] == [first.id, second.id]
+    assert all(m.status == "running" and m.attempts == 1 for m in claimed)
+    assert claim_due(EmailOutbox, limit=5) == []
+
+
+def test_claim_takes_back_a_stale_running_row():
+    mail = _mail(status="running", locked_at=datetime.utcnow() - STALE_LOCK - timedelta(seconds=1))
+    _mail(status="running", locked_at=datetime.utcnow())  # its worker is still alive
+
+    assert [m.id for m in claim_due(EmailOutbox, limit=5)] == [mail.id]
+
+
+# ---------------- MAIL OUTBOX ----------------
+def test_send_pending_uses_one_connection_for_the_batch():
+    _mail(), _mail()
+    connections = []
+
+    def factory():
+        connections.append(FakeSMTP())
+        return connections[-1]
+
+    assert send_pending(factory) == 2
+    assert len(connections) == 1 and len(connections[0].sent) == 2
+    assert {m.status for m in EmailOutbox.query} == {"sent"}
+
+
+def test_failed_email_is_retried_later(app):
+    mail = _mail()
+    smtp = FakeSMTP(fail_at=0)
+
+    send_pending(lambda: smtp)
+    db.session.refresh(mail)
+    assert mail.status == "pending" and mail.attempts == 1
+    assert mail.run_after > datetime.utcnow()
+    assert send_pending(lambda: smtp) == 0  # backoff: not due yet
+
+    mail.run_after = datetime.utcnow()
+    db.session.commit()
+    send_pending(lambda: smtp)
+    db.session.refresh(mail)
+    assert mail.status == "sent" and mail.attempts == 2
+
+
+def test_disconnect_reschedules_the_rest_of_the_batch():
+    mails = [_mail(), _mail(), _mail()]
+    send_pending(lambda: FakeSMTP(fail_at=1, error=smtplib.SMTPServerDisconnected()))
+
+    statuses = [db.session.get(EmailOutbox, m.id).status for m in mails]
+    assert statuses == ["sent", "pending", "pending"]
+
+
+def test_unreachable_smtp_server_keeps_the_emails(app):
+    mail = _mail()
+
+    def factory():
+        raise ConnectionRefusedError()
+
+    send_pending(factory)
+    db.session.refresh(mail)
+    assert mail.status == "pending" and mail.attempts == 1 and mail.sent_at is None
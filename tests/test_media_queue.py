@@ -0,0 +1,78 @@
+import os
+from datetime import datetime
+
+from PIL import Image
+
+from media_queue import LocalFakeUploader, run_pending
+from models import db, Album, MediaJob, Photo
+
+
+def _queued_photo(app) -> Photo:
+    os.makedirs(app.config["MEDIA_SPOOL_FOLDER"], exist_ok=True)
+    spool = os.path.join(app.config["MEDIA_SPOOL_FOLDER"], "photo.png")
+    Image.new("RGB", (64, 48), "green").save(spool)
+
+    album = Album(title="Camp", approved=True)
+    db.session.add(album)
+    db.session.flush()
+    photo = Photo(album_id=album.id, file_path="", approved=True, upload_status="pending")
+    db.session.add(photo)
+    db.session.flush()
+    db.session.add(MediaJob(kind="upload", target_type="photo", target_id=photo.id, subfolder="albums", spool_path=spool))
+    db.session.commit()
+    return photo
+
+
+def test_upload_job_retries_then_completes(app, tmp_path):
+    photo = _queued_photo(app)
+    uploader = LocalFakeUploader(folder=str(tmp_path), fail_times=1)
+
+    assert run_pending(uploader) == 1
+    job = MediaJob.query.one()
+    assert job.status == "pending" and job.attempts == 1 and "simulated" in job.last_error
+    assert db.session.get(Photo, photo.id).upload_status == "pending"
+
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+    run_pending(uploader)
+
+    job = MediaJob.query.one()
+    photo = db.session.get(Photo, photo.id)
+    assert job.status == "done" and job.attempts == 2
+    assert photo.upload_status == "ready" and photo.file_path.endswith(".png")
+    assert not os.path.exists(job.spool_path)
+
+
+def test_upload_job_gives_up_after_max_attempts(app, tmp_path):
+    app.config["MEDIA_JOB_MAX_ATTEMPTS"] = 2
+    try:
+        photo = _queued_photo(app)
+        uploader = LocalFakeUploader(folder=str(tmp_path), fail_times=5)
+        for _ in range(2):
+            MediaJob.query.update({"run_after": datetime.utcnow()})
+            db.session.commit()
+            run_pending(uploader)
+    finally:
+        app.config["MEDIA_JOB_MAX_ATTEMPTS"] = 5
+
+    assert MediaJob.query.one().status == "failed"
+    assert db.session.get(Photo, photo.id).upload_status == "failed"
+
+
+def test_in_process_worker_starts_with_gunicorn_not_at_import(monkeypatch):
+    import app as app_module
+    from config import Config
+
+    started = []
+    monkeypatch.setattr(app_module, "start_worker_thread", lambda app: started.append("media-worker"))
+    monkeypatch.setattr(app_module, "start_sender_thread", lambda app: started.append("mail-sender"))
+    monkeypatch.setattr(app_module, "media_queue_enabled", lambda: True)
+    monkeypatch.setattr(app_module, "mail_enabled", lambda: True)
+    for name in ("MEDIA_WORKER_IN_PROCESS", "MAIL_SENDER_IN_PROCESS"):
+        monkeypatch.setattr(Config, name, True)
+
+    other = app_module.create_app()  # what `flask --app app migrate` runs
+    assert started == []
+
+    app_module.start_background_threads(other)  # gunicorn post_worker_init
+    assert started == ["media-worker", "mail-sender"]
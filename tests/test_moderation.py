@@ -0,0 +1,88 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from images import BLOB_FRESH_SECONDS
+from models import db, Album, NewsPost, Photo, SyncTombstone
+
+
+@pytest.fixture
+def blob_folder(app):
+    """Stored blobs must live under static/ for delete_uploaded_images()."""
+    folder = os.path.join(app.root_path, "static", "uploads_tests")
+    os.makedirs(folder, exist_ok=True)
+    yield folder
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def _local_file(app, folder: str, name: str) -> str:
+    path = os.path.join(folder, name)
+    open(path, "wb").close()
+    aged = time.time() - BLOB_FRESH_SECONDS - 1  # not an upload still committing
+    os.utime(path, (aged, aged))
+    return "/" + os.path.relpath(path, app.root_path).replace(os.sep, "/")
+
+
+def _pending_album(n: int, file_path: str = "/static/none.jpg") -> Album:
+    album = Album(title="Camp", approved=False)
+    db.session.add(album)
+    db.session.flush()
+    db.session.add_all(Photo(album_id=album.id, file_path=file_path, approved=False) for _ in range(n))
+    db.session.commit()
+    return album
+
+
+def test_queue_lists_pending_photos_of_every_album(staff):
+    for _ in range(2):
+        _pending_album(2)
+
+    html = staff.get("/staff/moderation").get_data(as_text=True)
+    assert html.count('name="ids" value=') == 4 + 2  # photos + albums
+
+
+def test_bulk_approve(staff):
+    album = _pending_album(3)
+    ids = [p.id for p in Photo.query.filter_by(album_id=album.id)]
+
+    resp = staff.post("/staff/moderation", data={"action": "approve", "kind": "photo", "ids": ids[:2]})
+    assert resp.status_code == 302
+    assert sorted(p.approved for p in Photo.query) == [False, True, True]
+
+    staff.post("/staff/moderation", data={"action": "approve", "kind": "album", "ids": [album.id]})
+    assert db.session.get(Album, album.id).approved
+
+
+def test_bulk_reject_removes_only_unreferenced_blobs(app, staff, blob_folder):
+    shared, alone = _local_file(app, blob_folder, "shared.jpg"), _local_file(app, blob_folder, "alone.jpg")
+    album = _pending_album(0)
+    rejected = [Photo(album_id=album.id, file_path=path, approved=False) for path in (shared, alone)]
+    db.session.add_all(rejected)
+    db.session.add(NewsPost(title="Même image", content="c", image_path=shared))
+    db.session.commit()
+    ids = [p.id for p in rejected]
+
+    staff.post("/staff/moderation", data={"action": "reject", "kind": "photo", "ids": ids})
+
+    assert Photo.query.count() == 0
+    assert os.path.exists(os.path.join(app.root_path, shared.lstrip("/")))  # still used by the news
+    assert not os.path.exists(os.path.join(app.root_path, alone.lstrip("/")))
+    assert {t.ref_id for t in SyncTombstone.query.filter_by(kind="photo")} == set(ids)
+
+
+def test_reject_album_deletes_its_photos(staff):
+    album = _pending_album(2)
+    staff.post("/staff/moderation", data={"action": "reject", "kind": "album", "ids": [album.id]})
+
+    assert Album.query.count() == 0 and Photo.query.count() == 0
+    assert SyncTombstone.query.filter_by(kind="album").count() == 1
+
+
+def test_members_cannot_moderate(client):
+    from conftest import login, make_user
+
+    make_user("member")
+    login(client, "member")
+    assert client.get("/staff/moderation").status_code == 302
+    assert client.post("/staff/moderation", data={"action": "approve", "kind": "photo", "ids": [1]}).status_code == 302
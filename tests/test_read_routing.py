@@ -0,0 +1,62 @@
+from flask import g
+
+from conftest import login, make_user
+from models import db, Album, NewsPost, User
+
+
+def _replica_insert(model, **values):
+    with db.engines["read"].begin() as conn:
+        conn.execute(model.__table__.insert(), [values])
+
+
+def test_read_only_queries_use_the_read_bind(app):
+    db.session.add(NewsPost(title="Sur la base principale", content="c"))
+    db.session.commit()
+
+    with app.test_request_context():
+        g.db_read_only = True
+        assert NewsPost.query.count() == 0  # the replica has not caught up
+        g.db_read_only = False
+        assert NewsPost.query.count() == 1
+
+
+def test_writes_of_a_read_only_view_go_to_the_primary(app):
+    with app.test_request_context():
+        g.db_read_only = True
+        db.session.add(NewsPost(title="Écrit pendant une vue en lecture", content="c"))
+        db.session.commit()
+        g.db_read_only = False
+        assert NewsPost.query.count() == 1
+
+
+def test_public_page_reads_the_replica(client):
+    db.session.add(NewsPost(title="Pas encore répliquée", content="c"))
+    db.session.commit()
+    _replica_insert(NewsPost, title="Déjà répliquée", content="c", image_path="", cloudinary_public_id="",
+                    event_link="", upload_status="ready")
+
+    html = client.get("/actus").get_data(as_text=True)
+    assert "Déjà répliquée" in html
+    assert "Pas encore répliquée" not in html
+
+
+def test_user_reads_the_primary_right_after_a_write(client):
+    user = make_user("kp", role="KP")
+    _replica_insert(User, id=user.id, username=user.username, password_hash=user.password_hash,
+                    role="KP", role_requested="", role_validated=True, created_at=user.created_at)
+    album = Album(title="Camp d'été", approved=False)
+    db.session.add(album)
+    db.session.commit()
+    _replica_insert(Album, id=album.id, title="Camp d'été", description="", approved=False)
+    login(client, "kp")
+
+    assert "Album en attente" in client.get("/espace").get_data(as_text=True)
+
+    # The approval commits on the primary ; the lagging replica still says pending
+    resp = client.post(f"/album/{album.id}/approve", follow_redirects=True)
+    assert "Album en attente" not in resp.get_data(as_text=True)
+
+    with client.session_transaction() as session:
+        session["db_primary_until"] = 0  # pin expired: back to the replica
+    db.session.remove()  # the test's app context shares one ORM session across requests
+    assert "Album en attente" in client.get("/espace").get_data(as_text=True)
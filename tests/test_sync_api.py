@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login, make_user
+from models import db, Album, NewsPost, Photo
+from moderation import reject_photos
+
+
+@pytest.fixture(autouse=True)
+def no_sync_lag(app):
+    app.config["API_SYNC_LAG"] = 0
+    yield
+    app.config["API_SYNC_LAG"] = 2
+
+
+def _post(title: str, age: timedelta) -> NewsPost:
+    when = datetime.utcnow() - age
+    post = NewsPost(title=title, content="c", created_at=when, updated_at=when)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def _since(client, url: str, since: str) -> dict:
+    resp = client.get(url, query_string={"since": since})
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_since_returns_only_rows_changed_after_it(client):
+    _post("Ancienne", timedelta(hours=2))
+    _post("Récente", timedelta(minutes=5))
+
+    data = _since(client, "/api/v1/news", (datetime.utcnow() - timedelta(hours=1)).isoformat())
+    assert [item["title"] for item in data["items"]] == ["Récente"]
+    assert data["deleted"] == [] and data["more"] is False
+
+    # Nothing changed since the returned token
+    assert _since(client, "/api/v1/news", data["since"])["items"] == []
+
+
+def test_since_reports_deletions_as_tombstones(client):
+    post = _post("Supprimée", timedelta(hours=2))
+    token = _since(client, "/api/v1/news", (datetime.utcnow() - timedelta(hours=1)).isoformat())["since"]
+
+    db.session.delete(post)
+    db.session.commit()
+
+    data = _since(client, "/api/v1/news", token)
+    assert data["items"] == [] and data["deleted"] == [post.id]
+    assert _since(client, "/api/v1/news", data["since"])["deleted"] == []
+
+
+def test_since_pages_with_a_resume_token(client):
+    for i in range(3):
+        _post(f"Actu {i}", timedelta(minutes=10 - i))
+
+    seen, since = [], (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    while True:
+        resp = client.get("/api/v1/news", query_string={"since": since, "limit": 2})
+        data = resp.get_json()
+        seen += [item["title"] for item in data["items"]]
+        since = data["since"]
+        if not data["more"]:
+            break
+    assert seen == ["Actu 0", "Actu 1", "Actu 2"]
+
+
+def test_bad_since_is_rejected(client):
+    assert client.get("/api/v1/news?since=hier").status_code == 400
+
+
+def test_bulk_reject_writes_photo_tombstones(client):
+    make_user("member")
+    album = Album(title="Camp", approved=True)
+    db.session.add(album)
+    db.session.flush()
+    photos = [Photo(album_id=album.id, file_path=f"/static/x{i}.jpg", approved=False) for i in range(2)]
+    db.session.add_all(photos)
+    db.session.commit()
+    ids = sorted(p.id for p in photos)
+    login(client, "member")
+    token = _since(client, "/api/v1/photos", (datetime.utcnow() - timedelta(hours=1)).isoformat())["since"]
+
+    reject_photos(ids)
+    db.session.commit()
+
+    assert sorted(_since(client, "/api/v1/photos", token)["deleted"]) == ids
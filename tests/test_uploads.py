@@ -0,0 +1,120 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import uploads
+from models import db, Album, Photo
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(app):
+    app.config["UPLOAD_CHUNK_SIZE"] = CHUNK
+    yield
+    app.config["UPLOAD_CHUNK_SIZE"] = 512 * 1024
+
+
+@pytest.fixture
+def album():
+    album = Album(title="Camp", approved=True)
+    db.session.add(album)
+    db.session.commit()
+    return album
+
+
+def _jpeg() -> bytes:
+    """Noise compresses badly: a few chunks of 64 KB."""
+    buf = io.BytesIO()
+    Image.effect_noise((600, 400), 90).convert("RGB").save(buf, "JPEG", quality=95)
+    assert len(buf.getvalue()) > 2 * CHUNK
+    return buf.getvalue()
+
+
+def _create(client, album, data: bytes, filename: str = "camp.jpg"):
+    resp = client.post("/upload", json={
+        "filename": filename, "size": len(data), "target": "album",
+        "album_id": album.id, "consent": "yes", "caption": "Veillée",
+    })
+    assert resp.status_code == 201
+    return resp.get_json()
+
+
+def _patch(client, url: str, at: int, chunk: bytes):
+    return client.patch(url, data=chunk, headers={"Upload-Offset": str(at)})
+
+
+def test_chunked_upload_creates_a_pending_photo(staff, album):
+    data = _jpeg()
+    session = _create(staff, album, data)
+    assert session["chunk_size"] == CHUNK
+
+    at = 0
+    while at < len(data):
+        resp = _patch(staff, session["url"], at, data[at:at + CHUNK])
+        assert resp.status_code == 200
+        at = resp.get_json()["offset"]
+
+    body = resp.get_json()
+    assert body["done"] is True
+    photo = db.session.get(Photo, body["photo_id"])
+    assert photo.album_id == album.id and photo.caption == "Veillée" and not photo.approved
+    assert (photo.width, photo.height) == (600, 400)
+    assert staff.head(session["url"]).status_code == 404  # session cleaned up
+
+
+def test_bad_magic_bytes_are_refused_on_the_first_chunk(staff, album):
+    fake = b"GIF89a" + os.urandom(3 * CHUNK)
+    session = _create(staff, album, fake)
+
+    resp = _patch(staff, session["url"], 0, fake[:CHUNK])
+    assert resp.status_code == 415
+    assert staff.head(session["url"]).status_code == 404
+    assert Photo.query.count() == 0
+
+
+def test_replayed_chunk_gets_409_and_the_real_offset(staff, album):
+    data = _jpeg()
+    session = _create(staff, album, data)
+
+    assert _patch(staff, session["url"], 0, data[:CHUNK]).status_code == 200
+    # Response lost: the client sends the same chunk again
+    resp = _patch(staff, session["url"], 0, data[:CHUNK])
+    assert resp.status_code == 409 and resp.get_json()["offset"] == CHUNK
+
+    head = staff.head(session["url"])
+    assert head.headers["Upload-Offset"] == str(CHUNK)
+    assert head.headers["Upload-Length"] == str(len(data))
+
+
+def test_concurrent_write_of_the_same_upload_gets_423(staff, album):
+    data = _jpeg()
+    session = _create(staff, album, data)
+    open(uploads._lock_path(session["id"]), "w").close()  # another request is writing
+
+    assert _patch(staff, session["url"], 0, data[:CHUNK]).status_code == 423
+    assert staff.head(session["url"]).headers["Upload-Offset"] == "0"
+
+
+def test_chunk_size_never_below_the_header_check(app, staff, album):
+    app.config["UPLOAD_CHUNK_SIZE"] = 16 * 1024
+    assert _create(staff, album, _jpeg())["chunk_size"] == uploads.HEAD_BYTES
+
+
+def test_someone_else_cannot_resume_an_upload(app, staff, album):
+    from conftest import login, make_user
+
+    session = _create(staff, album, _jpeg())
+    other = app.test_client()
+    make_user("other", role="KP")
+    login(other, "other")
+    assert other.head(session["url"]).status_code == 404
+
+
+def test_batch_form_keeps_its_single_post(staff, album):
+    html = staff.get(f"/album/{album.id}").get_data(as_text=True)
+    batch = html[html.index("Ajout groupé"):]
+    assert "data-chunked-upload" in html[:html.index("Ajout groupé")]
+    assert "data-chunked-upload" not in batch[:batch.index("</form>")]
@@ -0,0 +1,243 @@
+import io
+import json
+import os
+import re
+import secrets
+import time
+
+from flask import current_app
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+# Resumable uploads: the client declares the file, then sends it in chunks
+# (PATCH with Upload-Offset). Chunks are appended to <folder>/<id>.part next
+# to <id>.json ; after a dropped connection, HEAD tells where to resume.
+# The first chunk is checked (magic bytes, pixel size) before anything else
+# is accepted, so a bad or oversized file costs one chunk, not the whole body.
+
+UPLOAD_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+# The first chunk must hold at least this much (or the whole file): EXIF
+# blocks come before the JPEG size marker
+HEAD_BYTES = 64 * 1024
+
+# Magic bytes -> Pillow format ; WebP is RIFF....WEBP
+MAGIC = ((b"\xff\xd8\xff", "JPEG"), (b"\x89PNG\r\n\x1a\n", "PNG"))
+
+
+class UploadError(Exception):
+    """Refused upload ; status is the HTTP code to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def sniff_format(head: bytes):
+    """Image format from the first bytes, None when not JPEG / PNG / WebP."""
+    for magic, fmt in MAGIC:
+        if head.startswith(magic):
+            return fmt
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def check_header(head: bytes, max_pixels: int) -> dict:
+    """Validate the first chunk: real image of an allowed format, sane size.
+
+    Pillow only parses the header here, the pixels are not decoded.
+    Returns {"format", "width", "height"} ; raises UploadError.
+    """
+    fmt = sniff_format(head)
+    if fmt is None:
+        raise UploadError("Format non autorisé (png/jpg/jpeg/webp).", 415)
+    try:
+        with Image.open(io.BytesIO(head)) as img:
+            width, height, found = img.width, img.height, img.format
+    except Exception:
+        raise UploadError("Image illisible.", 415)
+    if found != fmt:
+        raise UploadError("Format non autorisé (png/jpg/jpeg/webp).", 415)
+    if width * height > max_pixels:
+        raise UploadError(f"Image trop grande ({width}×{height} pixels).", 413)
+    return {"format": fmt, "width": width, "height": height}
+
+
+def chunk_size() -> int:
+    """UPLOAD_CHUNK_SIZE, never below HEAD_BYTES: the first chunk must hold the header."""
+    return max(current_app.config.get("UPLOAD_CHUNK_SIZE", 512 * 1024), HEAD_BYTES)
+
+
+def _folder() -> str:
+    # Relative to the app, like PRERENDER_FOLDER: every worker uses the same
+    # folder whatever directory it was started from
+    return os.path.join(current_app.root_path, current_app.config["UPLOAD_SESSION_FOLDER"])
+
+
+def _paths(upload_id: str):
+    base = os.path.join(_folder(), upload_id)
+    return base + ".json", base + ".part"
+
+
+def _lock_path(upload_id: str) -> str:
+    return os.path.join(_folder(), upload_id + ".lock")
+
+
+# A lock older than this was left by a killed worker
+LOCK_STALE = 120
+
+
+def _acquire_lock(upload_id: str) -> bool:
+    """O_EXCL lock file (works on Windows too, unlike flock) ; False when held."""
+    path = _lock_path(upload_id)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < LOCK_STALE:
+                    return False
+                os.remove(path)
+            except OSError:
+                pass
+    return False
+
+
+def _release_lock(upload_id: str):
+    try:
+        os.remove(_lock_path(upload_id))
+    except OSError:
+        pass
+
+
+def _write_meta(meta: dict):
+    meta_path, _ = _paths(meta["id"])
+    tmp = f"{meta_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def purge_stale(ttl: int) -> int:
+    """Delete sessions untouched for ttl seconds (abandoned uploads)."""
+    folder = _folder()
+    if not os.path.isdir(folder):
+        return 0
+    limit = time.time() - ttl
+    removed = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def create_session(user_id: int, filename: str, size: int, target: str, **extra) -> dict:
+    """Declare an upload ; the size is checked before any byte is sent."""
+    cfg = current_app.config
+    max_bytes = cfg.get("UPLOAD_MAX_MB", 10) * 1024 * 1024
+    if size <= 0:
+        raise UploadError("Taille de fichier manquante.")
+    if size > max_bytes:
+        raise UploadError(f"Fichier trop lourd ({cfg.get('UPLOAD_MAX_MB', 10)} Mo maximum).", 413)
+
+    os.makedirs(_folder(), exist_ok=True)
+    purge_stale(cfg.get("UPLOAD_SESSION_TTL", 86400))
+    meta = {
+        "id": secrets.token_urlsafe(24),
+        "user_id": user_id,
+        "filename": os.path.basename(filename),
+        "size": size,
+        "target": target,
+        "checked": False,
+        "created": time.time(),
+        **extra,
+    }
+    _write_meta(meta)
+    open(_paths(meta["id"])[1], "wb").close()
+    return meta
+
+
+def load_session(upload_id: str, user_id: int):
+    """Session of user_id, None when unknown, expired or someone else's."""
+    if not UPLOAD_ID.match(upload_id or ""):
+        return None
+    meta_path, _ = _paths(upload_id)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("user_id") == user_id else None
+
+
+def offset(meta: dict) -> int:
+    try:
+        return os.path.getsize(_paths(meta["id"])[1])
+    except OSError:
+        return 0
+
+
+def append_chunk(meta: dict, at: int, data: bytes) -> int:
+    """Write data at offset at (must be the current end) ; returns the new offset.
+
+    A chunk sent twice after a lost response is answered with 409 and the
+    real offset, the client resumes from there. A retry arriving while the
+    first copy is still being written gets 423 (one writer per upload).
+    """
+    if not _acquire_lock(meta["id"]):
+        raise UploadError("Un morceau de cet envoi est déjà en cours d'écriture.", 423)
+    try:
+        return _append_locked(meta, at, data)
+    finally:
+        _release_lock(meta["id"])
+
+
+def _append_locked(meta: dict, at: int, data: bytes) -> int:
+    current = offset(meta)
+    if at != current:
+        raise UploadError(f"Offset attendu : {current}.", 409)
+    if current + len(data) > meta["size"]:
+        discard(meta)
+        raise UploadError("Le fichier dépasse la taille annoncée.", 413)
+
+    if not meta["checked"]:
+        if len(data) < min(meta["size"], HEAD_BYTES):
+            raise UploadError("Premier morceau trop court.", 400)
+        try:
+            info = check_header(data, current_app.config.get("UPLOAD_MAX_PIXELS", 40_000_000))
+        except UploadError:
+            discard(meta)
+            raise
+        meta.update(checked=True, **info)
+        _write_meta(meta)
+
+    with open(_paths(meta["id"])[1], "ab") as f:
+        f.write(data)
+    os.utime(_paths(meta["id"])[0])  # keeps an active session out of purge_stale
+    return current + len(data)
+
+
+def is_complete(meta: dict) -> bool:
+    return meta["checked"] and offset(meta) == meta["size"]
+
+
+def open_file(meta: dict) -> FileStorage:
+    """The assembled file as an upload, for store_upload() ; close it when done."""
+    _, part_path = _paths(meta["id"])
+    return FileStorage(stream=open(part_path, "rb"), filename=meta["filename"], name="image")
+
+
+def discard(meta: dict):
+    for path in (*_paths(meta["id"]), _lock_path(meta["id"])):
+        try:
+            os.remove(path)
+        except OSError:
+            pass